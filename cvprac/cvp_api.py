@@ -131,12 +131,20 @@ class CvpApi(object):
             return False
         return True
 
-    def get_cvp_info(self):
+    def get_cvp_info(self, refresh=False):
         ''' Returns information about CVP.
 
+            The CVP version does not change while connected, so the result is
+            cached on the client until the next connect() call.
+
+            Args:
+                refresh (bool): Query CVP even if the information is cached.
+
             Returns:
                 cvp_info (dict): CVP Information
         '''
+        if self.clnt.cvp_info is not None and not refresh:
+            return dict(self.clnt.cvp_info)
         if not self.clnt.is_cvaas:
             data = self.clnt.get('/cvpInfo/getCvpInfo.do',
                                  timeout=self.request_timeout)
@@ -144,8 +152,10 @@ class CvpApi(object):
             # For CVaaS do not run the getCvpInfo REST API and assume the
             # latest version of the API
             data = {'version': 'cvaas'}
-        if 'version' in data and self.clnt.apiversion is None:
-            self.clnt.set_version(data['version'])
+        if 'version' in data:
+            self.clnt.cvp_info = dict(data)
+            if self.clnt.apiversion is None:
+                self.clnt.set_version(data['version'])
         return data
 
     # pylint: disable=too-many-arguments
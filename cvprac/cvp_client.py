@@ -46,7 +46,11 @@ be automatically retried on the same node if the request receives a
 CvpSessionLogOutError.  For this case a login will be performed before the
 request is retried.  For either case, the maximum number of times a request
 will be retried on the same node is specified by the class attribute
-NUM_RETRY_REQUESTS.
+NUM_RETRY_REQUESTS.  Retries on the same node are spaced out using an
+exponential backoff with jitter (see the BACKOFF_* class attributes).  A
+request that receives a 502, 503 or 504 status is also retried on the same
+node after the backoff delay, or after the delay given by the Retry-After
+header of a 503 response.
 
 If more than one CVP node is specified when creating a connection, and a GET
 or POST request that receives a requests.exceptions.ConnectionError,
@@ -60,7 +64,8 @@ If any of the errors persists across all nodes then the GET or POST request
 will fail and the last error that occurred will be raised.
 
 The class provides connect, get, and post methods that allow the user to make
-direct RESTful API calls to CVP.
+direct RESTful API calls to CVP.  The batch method makes several independent
+calls concurrently.
 
 Example:
 
@@ -93,31 +98,119 @@ Example:
 import os
 import re
 import json
+import random
+import time
 import logging
-from logging.handlers import SysLogHandler
-from itertools import cycle
-from pkg_resources import parse_version
+import warnings
+import socket
+import threading
+import weakref
+from bisect import bisect_right
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from email.utils import parsedate_to_datetime
 
 import requests
+from packaging.version import Version
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectionError, HTTPError, Timeout, \
     ReadTimeout, TooManyRedirects, JSONDecodeError
+from urllib3.connection import HTTPConnection
 
+try:
+    from requests_toolbelt import MultipartEncoder
+except ImportError:
+    MultipartEncoder = None
+
+from cvprac import cvp_http2
 from cvprac.cvp_api import CvpApi
 from cvprac.cvp_client_errors import CvpApiError, CvpLoginError, \
     CvpRequestError, CvpSessionLogOutError
+from cvprac.cvp_json import json_decoder, json_dumps, json_loads
+
+
+# Minimum CVP version for each API version, sorted by CVP version. CVP
+# versions below the first entry use API version 1.0.
+_API_VERSION_TABLE = [(Version('2018.2.0'), 2.0),
+                      (Version('2019.0.0'), 3.0),
+                      (Version('2020.1.1'), 4.0),
+                      (Version('2020.2.4'), 5.0),
+                      (Version('2021.2.0'), 6.0),
+                      (Version('2021.3.0'), 7.0),
+                      (Version('2022.1.0'), 8.0)]
+_API_VERSION_THRESHOLDS = [entry[0] for entry in _API_VERSION_TABLE]
+
+# Markers searched for in the raw response body. Scanning the bytes avoids
+# decoding the whole body to text just to look for them.
+_LOGOUT_SENTINEL = b'LOG OUT MESSAGE'
+_UNAUTH_SENTINEL = b'User is unauthorized'
+# Error messages of a request from a logged out user. 'Unauthorized' is
+# for 2018.x and 'User is unauthorized' is for 2019.x.
+_UNAUTH_RE = re.compile(r'(?:User is u|U)nauthorized')
+
+# Login error for CVaaS clients without an API token.
+_CVAAS_LOGIN_MSG = ('CVaaS only supports API token authentication. Please'
+                    ' create an API token and provide it via the api_token'
+                    ' parameter in combination with the is_cvaas parameter')
+
+# Errors raised by a failed login. Any of them is a good reason not to use
+# the CVP node.
+_LOGIN_ERRORS = (ConnectionError, CvpApiError, CvpRequestError,
+                 CvpSessionLogOutError, HTTPError, JSONDecodeError,
+                 ReadTimeout, Timeout, TooManyRedirects)
+
+# Snapshot of the session used to send a request. See
+# CvpClient._session_state.
+_SessionState = namedtuple('_SessionState',
+                           ['generation', 'session', 'cookies', 'headers',
+                            'file_headers', 'node_idx', 'url_prefix',
+                            'url_prefix_short'])
 
 
 class CvpClient(object):
     ''' Use this class to create a persistent connection to CVP.
     '''
     # pylint: disable=too-many-instance-attributes
+    # pylint: disable=too-many-lines
     # Maximum number of times to retry a get or post to the same
     # CVP node.
     NUM_RETRY_REQUESTS = 3
+    # Delay between retries to the same CVP node is
+    # BACKOFF_BASE * BACKOFF_FACTOR ** attempt seconds, capped at BACKOFF_MAX
+    # and stretched by a random factor of up to BACKOFF_JITTER.
+    BACKOFF_BASE = 1.0
+    BACKOFF_FACTOR = 2
+    BACKOFF_MAX = 30
+    BACKOFF_JITTER = 0.5
+    # HTTP status codes for which a request is retried on the same node.
+    RETRY_STATUS_CODES = (502, 503, 504)
+    # Number of consecutive failures after which a CVP node is considered
+    # unhealthy and is only tried after all of the healthy nodes.
+    NODE_FAIL_THRESHOLD = 3
+    # Weight of the latest request duration in a node's latency average.
+    NODE_LATENCY_WEIGHT = 0.2
+    # Number of per-host connection pools and maximum number of kept-alive
+    # connections per host for the HTTP session.
+    POOL_CONNECTIONS = 4
+    POOL_MAXSIZE = 16
+    # Number of seconds GET responses for URLs containing one of
+    # GET_CACHE_URLS are cached. Caching is disabled when the TTL is 0.
+    # At most GET_CACHE_SIZE responses are kept. The CVP info is not in
+    # GET_CACHE_URLS since CvpApi.get_cvp_info caches it until the next
+    # connect().
+    GET_CACHE_TTL = 0
+    GET_CACHE_URLS = ('/inventory/',)
+    GET_CACHE_SIZE = 256
+    # Number of seconds between the requests made by the keepalive thread
+    # to stop an idle session from being logged out by CVP.
+    KEEPALIVE_INTERVAL = 300
+    KEEPALIVE_URL = '/cvpInfo/getCvpInfo.do'
     LATEST_API_VERSION = 8.0
 
     def __init__(self, logger='cvprac', syslog=False, filename=None,
-                 log_level='INFO'):
+                 log_level='INFO', use_http2=False, keepalive=False):
         ''' Initialize the client and configure logging.  Either syslog, file
             logging, both, or none can be enabled.  If neither syslog
             nor filename is specified then no logging will be performed.
@@ -129,7 +222,33 @@ class CvpClient(object):
                 filename (str): Log to the file specified by filename. Default
                     is None.
                 log_level (str): Log level to use for logger. Default is INFO.
+                use_http2 (bool): If True send the requests over HTTP/2 with
+                    the httpx module so concurrent requests share one
+                    connection per node. If the h2 module used by httpx
+                    for HTTP/2 is not installed a RuntimeWarning is issued
+                    and the requests module is used. Default is False.
+                keepalive (bool): If True a background thread makes a request
+                    every KEEPALIVE_INTERVAL seconds after a username and
+                    password login so the session is not logged out for
+                    being idle. Default is False.
+
+            Raises:
+                ImportError: An ImportError is raised if use_http2 is True
+                    and the httpx module is not installed.
         '''
+        # pylint: disable=too-many-arguments
+        # pylint: disable=too-many-statements
+        if use_http2 and cvp_http2.httpx is None:
+            raise ImportError('use_http2 requires the httpx module with'
+                              ' HTTP/2 support (pip install httpx[http2])')
+        if use_http2 and not cvp_http2.H2_INSTALLED:
+            warnings.warn('use_http2 requires the h2 module (pip install'
+                          ' httpx[http2]). Using HTTP/1.1 instead.',
+                          RuntimeWarning, stacklevel=2)
+            use_http2 = False
+        self.use_http2 = use_http2
+        self.keepalive = keepalive
+        self._keepalive_stop = None
         self.apiversion = None
         self.authdata = None
         self.cert = False
@@ -137,11 +256,25 @@ class CvpClient(object):
         self.cookies = None
         self.error_msg = ''
         self.node_cnt = None
-        self.node_pool = None
         self.nodes = None
         self.port = None
-        self.protocol = None
+        # The protocol is not configurable, all connections to CVP use https.
+        self.protocol = 'https'
+        self._port = None
         self.session = None
+        self._http_session = None
+        # Held while the session is replaced so concurrent requests wait
+        # for the new session. The generation counts the replacements.
+        self._session_lock = threading.RLock()
+        self._session_generation = 0
+        self._requests_in_flight = 0
+        # Set while a failover is logging in to another node.
+        self._failover_done = None
+        self._pool_maxsize = self.POOL_MAXSIZE
+        # Adapters replaced by a larger pool, closed once they are unused.
+        self._retired_adapters = []
+        self._get_cache = {}
+        self._get_cache_lock = threading.Lock()
         self.url_prefix = None
         self.url_prefix_short = None
         self.is_cvaas = False
@@ -149,16 +282,28 @@ class CvpClient(object):
         self.cvaas_token = None
         self.api_token = None
         self.version = None
+        self.cvp_info = None
         self._last_used_node = None
+        self._current_host = None
+        self._node_idx = None
+        self._node_health = None
+        self._node_urls = None
 
         # Save proper headers
         self.headers = {'Accept': 'application/json',
                         'Content-Type': 'application/json'}
+        # Headers for file uploads, which set their own Content-Type.
+        # Kept in sync with self.headers by _update_file_headers.
+        self._file_headers = None
+        self._update_file_headers()
 
         self.log = logging.getLogger(logger)
         self.set_log_level(log_level)
         if syslog:
             # Enables sending logging messages to the local syslog server.
+            # Imported here so clients that do not log to syslog skip it.
+            # pylint: disable=import-outside-toplevel
+            from logging.handlers import SysLogHandler
             self.log.addHandler(SysLogHandler())
         if filename:
             # Enables sending logging messages to a file.
@@ -231,33 +376,12 @@ class CvpClient(object):
                               ' Appending 0. Updated Version String - %s',
                               ".".join(version_components))
             full_version = ".".join(version_components)
-            if parse_version(full_version) >= parse_version('2022.1.0'):
-                self.log.info('Setting API version to v8')
-                self.apiversion = 8.0
-            elif parse_version(full_version) >= parse_version('2021.3.0'):
-                self.log.info('Setting API version to v7')
-                self.apiversion = 7.0
-            elif parse_version(full_version) >= parse_version('2021.2.0'):
-                self.log.info('Setting API version to v6')
-                self.apiversion = 6.0
-            elif parse_version(full_version) >= parse_version('2020.2.4'):
-                self.log.info('Setting API version to v5')
-                self.apiversion = 5.0
-            elif parse_version(full_version) >= parse_version('2020.1.1'):
-                self.log.info('Setting API version to v4')
-                self.apiversion = 4.0
-            elif parse_version(full_version) >= parse_version('2019.0.0'):
-                self.log.info('Setting API version to v3')
-                self.apiversion = 3.0
-            elif parse_version(full_version) >= parse_version('2018.2.0'):
-                self.log.info('Setting API version to v2')
-                self.apiversion = 2.0
-            else:
-                self.log.info('Setting API version to v1')
-                self.apiversion = 1.0
+            idx = bisect_right(_API_VERSION_THRESHOLDS, Version(full_version))
+            self.apiversion = _API_VERSION_TABLE[idx - 1][1] if idx else 1.0
+            self.log.info('Setting API version to v%d', self.apiversion)
 
     def connect(self, nodes, username, password, connect_timeout=10,
-                request_timeout=30, protocol='https', port=None, cert=False,
+                request_timeout=30, protocol=None, port=None, cert=False,
                 is_cvaas=False, tenant=None, api_token=None, cvaas_token=None):
         ''' Login to CVP and get a session ID and cookie.  Currently
             certificates are not verified if the https protocol is specified. A
@@ -271,14 +395,12 @@ class CvpClient(object):
                     connection.
                 request_timeout (int): The default number of seconds to allow
                     api requests to complete before timing out.
-                protocol (str): The protocol to use to connect to CVP.
-                    THIS PARAMETER IS NOT USED AND WILL BE DEPRECATED.
-                    ONLY INCLUDED TO NOT BREAK EXISTING CODE THAT HAS PROTOCOL
-                    SPECIFIED IN CONNECTION.
+                protocol (str): DEPRECATED. This parameter is not used and
+                    only kept to not break existing code that has protocol
+                    specified in connection. All connections use https.
                 port (int): The TCP port of the endpoint for the connection.
-                    If this keyword is not specified, the default value is
-                    automatically determined by the transport type.
-                    (http=80, https=443)
+                    If this keyword is not specified, the default https port
+                    443 is used.
                 cert (str or boolean): Path to a cert file used for a https
                     connection or boolean with default False. If a cert is
                     provided then the connection will not attempt to fallback
@@ -297,8 +419,6 @@ class CvpClient(object):
                     could not be established to any of the nodes.
                 TypeError: A TypeError is raised if the nodes argument is not
                     a list.
-                ValueError: A ValueError is raised if a port is not specified
-                    and the protocol is not http or https.
         '''
         # pylint: disable=too-many-arguments
         if not isinstance(nodes, list):
@@ -314,14 +434,25 @@ class CvpClient(object):
 
         self.cert = cert
         self.nodes = nodes
+        self.cvp_info = None
+        self.clear_cache()
+        self._stop_keepalive()
         self.node_cnt = len(nodes)
-        self.node_pool = cycle(nodes)
+        # Start on the last node so the first session is attempted with the
+        # first node in the list.
+        self._node_idx = self.node_cnt - 1
+        self._node_health = [{'fail_streak': 0, 'ewma_latency': 0.0}
+                             for _ in nodes]
         self.authdata = {'userId': username, 'password': password}
         self.connect_timeout = connect_timeout
         self.api.request_timeout = request_timeout
-        # protocol is deprecated and not used.
-        self.protocol = protocol
+        if protocol is not None:
+            warnings.warn('The protocol parameter is deprecated and not used.'
+                          ' All connections to CVP use https.',
+                          DeprecationWarning, stacklevel=2)
         self.port = port
+        self._port = port or 443
+        self._set_node_urls()
         self.is_cvaas = is_cvaas
         self.tenant = tenant
         if cvaas_token is not None:
@@ -345,54 +476,485 @@ class CvpClient(object):
                              ' generic')
             self.api_token = api_token
             self.cvaas_token = api_token
+        if self.api_token is not None:
+            # API token authentication only sets a header and does not make
+            # a login request, so there is no point trying each node. Use
+            # the first node and let the requests fail over if needed.
+            self._select_node(self._node_order(all_nodes=True)[0])
+            self._reset_session()
+            return
         self._create_session(all_nodes=True)
         # Verify that we can connect to at least one node
         if not self.session:
             raise CvpLoginError(self.error_msg)
+        if self.keepalive:
+            self._start_keepalive()
+
+    def _start_keepalive(self):
+        ''' Start the thread that keeps the CVP session from idling out.
+            The thread only holds a weak reference to the client so it stops
+            once the client is garbage collected.
+        '''
+        self._keepalive_stop = threading.Event()
+        thread = threading.Thread(target=_keepalive,
+                                  args=(weakref.ref(self),
+                                        self._keepalive_stop),
+                                  name='cvprac-keepalive')
+        thread.daemon = True
+        thread.start()
+
+    def _stop_keepalive(self):
+        ''' Stop the keepalive thread if it is running.
+        '''
+        if self._keepalive_stop is not None:
+            self._keepalive_stop.set()
+            self._keepalive_stop = None
 
     def _create_session(self, all_nodes=False):
         ''' Login to CVP and get a session ID and user information.
             If the all_nodes parameter is True then try creating a session
             with each CVP node.  If False, then try creating a session with
-            each node except the one currently connected to.
+            each node except the one currently connected to.  Must not be
+            called with the session lock held since the logins of a failover
+            are sent without holding it, see _login_parallel.
+        '''
+        with self._session_lock:
+            if self.node_cnt == 1:
+                # Single node deployments have no other node to rotate to.
+                host = self._select_node(0)
+                error = self._reset_session()
+                if error is None:
+                    self._node_health[0]['fail_streak'] = 0
+                    self.error_msg = '\n'
+                else:
+                    self._node_health[0]['fail_streak'] += 1
+                    self.error_msg = '\n%s: %s\n' % (host, error)
+                return
+            node_order = self._node_order(all_nodes)
+            # Only a failover logs in to several nodes at once. connect()
+            # tries the nodes one by one so it does not leave a session open
+            # on every node.
+            if all_nodes or self.api_token is not None:
+                errors = []
+                for node_idx in node_order:
+                    host = self._select_node(node_idx)
+                    self.log.debug('Trying node %s (fail streak %d, latency'
+                                   ' %.3fs)', host,
+                                   self._node_health[node_idx]['fail_streak'],
+                                   self._node_health[node_idx]['ewma_latency'])
+                    error = self._reset_session()
+                    if error is None:
+                        self._node_health[node_idx]['fail_streak'] = 0
+                        break
+                    self._node_health[node_idx]['fail_streak'] += 1
+                    errors.append('%s: %s\n' % (host, error))
+                self.error_msg = '\n' + ''.join(errors)
+                return
+            if self.is_cvaas:
+                raise CvpLoginError(_CVAAS_LOGIN_MSG)
+            generation = self._session_generation
+        self._login_parallel(node_order, generation)
+
+    def _login_parallel(self, node_order, generation):
+        ''' Send the login request to all of the nodes in node_order at the
+            same time and use the first node in that order that accepted the
+            login.  Unreachable nodes then delay a failover by a single
+            connect timeout instead of one timeout per node.  The logins are
+            sent without holding the session lock, so other threads keep
+            using the current session until a node accepted the login.  Each
+            login gets its own cookies and the less preferred nodes that also
+            accept the login are logged out of.
+
+            Args:
+                node_order (list): Indexes of the nodes in order of
+                    preference.
+                generation (int): Generation of the session being replaced.
+                    If another thread replaced the session while logging in
+                    then the session is left as is and the login is not used.
+        '''
+        # pylint: disable=too-many-locals
+        with self._session_lock:
+            if self._http_session is None:
+                self._http_session = self._new_session()
+            # The login threads get their own copy of the headers since the
+            # session id is added to self.headers once a node is selected.
+            headers = dict(self.headers)
+            headers.pop('APP_SESSION_ID', None)
+            sessions = [self._new_login_session() for _ in node_order]
+            logout_urls = [self._node_urls[node_idx][1] + '/login/logout.do'
+                           for node_idx in node_order]
+        executor = ThreadPoolExecutor(max_workers=len(node_order))
+        futures = [executor.submit(self._try_login, node_idx, headers, session)
+                   for node_idx, session in zip(node_order, sessions)]
+        # Do not wait for the logins to less preferred nodes once a node is
+        # selected. Their logouts only use the state captured above.
+        executor.shutdown(wait=False)
+        errors = []
+        selected = None
+        for position, future in enumerate(futures):
+            try:
+                response, joutput = future.result()
+            except _LOGIN_ERRORS as error:
+                self.log.error(error)
+                errors.append((node_order[position], error))
+                continue
+            selected = position
+            break
+        with self._session_lock:
+            for node_idx, _ in errors:
+                self._node_health[node_idx]['fail_streak'] += 1
+            if self._session_generation != generation:
+                # The session was replaced, for example by connect(), while
+                # logging in. Log out of the selected node as well.
+                self.log.debug('Session replaced during failover')
+                unused = len(futures) if selected is None else selected
+            else:
+                self.error_msg = '\n' + ''.join(
+                    '%s: %s\n' % (self._node_urls[node_idx][0], error)
+                    for node_idx, error in errors)
+                self._session_generation += 1
+                unused = len(futures)
+                if selected is None:
+                    # Every login failed so there is no session left to use.
+                    self.headers.pop('APP_SESSION_ID', None)
+                    self.session = None
+                else:
+                    node_idx = node_order[selected]
+                    self.log.debug('Logged in to node %s',
+                                   self._select_node(node_idx))
+                    self.cookies = response.cookies
+                    self.headers['APP_SESSION_ID'] = joutput['sessionId']
+                    self.session = self._http_session
+                    self._node_health[node_idx]['fail_streak'] = 0
+                    unused = selected + 1
+                self._update_file_headers()
+        for position in range(unused, len(futures)):
+            futures[position].add_done_callback(
+                partial(self._logout_node, sessions[position],
+                        logout_urls[position], headers))
+
+    def _logout_node(self, session, url, headers, future):
+        ''' Log out of a node whose login was not used by _login_parallel
+            so its session does not stay open on the node.
+
+            Args:
+                session (Session): The session the login was sent with.
+                url (str): The logout URL of the node.
+                headers (dict): Headers the login was sent with.
+                future (Future): The login request sent to the node.
+        '''
+        try:
+            response, joutput = future.result()
+        except _LOGIN_ERRORS:
+            return
+        headers = dict(headers, APP_SESSION_ID=joutput['sessionId'])
+        try:
+            session.post(url, cookies=response.cookies, headers=headers,
+                         timeout=self.connect_timeout)
+        except _LOGIN_ERRORS as error:
+            self.log.debug('Logout %s failed: %s', url, error)
+
+    def _try_login(self, node_idx, headers=None, session=None):
+        ''' Send the login request to the node at node_idx without changing
+            the state of the client.
+
+            Args:
+                node_idx (int): Index of the node in self.nodes.
+                headers (dict): Headers to send. Default is self.headers.
+                session (Session): Session to send the login with. Default
+                    is the HTTP session of the client.
+
+            Returns:
+                A tuple of the response and the decoded JSON response.
+        '''
+        if session is None:
+            session = self._http_session
+        url = self._node_urls[node_idx][1] + '/login/authenticate.do'
+        response = session.post(url, data=json_dumps(self.authdata),
+                                headers=headers or self.headers,
+                                timeout=self.connect_timeout,
+                                verify=self.cert)
+        joutput = self._is_good_response(response, 'Authenticate: %s' % url)
+        return response, joutput
+
+    def _select_node(self, node_idx):
+        ''' Make the CVP node at node_idx the current node.
+
+            Args:
+                node_idx (int): Index of the node in self.nodes.
+
+            Returns:
+                The host of the selected node.
         '''
-        num_nodes = self.node_cnt
+        self._node_idx = node_idx
+        host, self.url_prefix, self.url_prefix_short = \
+            self._node_urls[node_idx]
+        self._current_host = host
+        return host
+
+    def _set_node_urls(self):
+        ''' Build the host, URL prefix and short URL prefix of each CVP node
+            so they do not need to be formatted on every session creation.
+        '''
+        self._node_urls = [(host, 'https://%s:%d/web' % (host, self._port),
+                            'https://%s:%d' % (host, self._port))
+                           for host in self.nodes]
+
+    def _node_order(self, all_nodes=False):
+        ''' Return the indexes of the CVP nodes in the order they should be
+            tried.  Nodes are rotated round-robin starting after the current
+            node and the healthy nodes are then ordered by their average
+            request latency, nodes with the same latency keeping their
+            round-robin order.  Nodes that have failed NODE_FAIL_THRESHOLD
+            times in a row are moved to the end of the list.
+
+            Args:
+                all_nodes (bool): If False and there is more than one node
+                    then the current node is left out. Default is False.
+
+            Returns:
+                List of node indexes.
+        '''
+        num_nodes = len(self.nodes)
+        rotation = [(self._node_idx + offset) % num_nodes
+                    for offset in range(1, num_nodes + 1)]
         if not all_nodes and num_nodes > 1:
-            num_nodes -= 1
-
-        self.error_msg = '\n'
-        for _ in range(0, num_nodes):
-            host = next(self.node_pool)
-            self.url_prefix = ('https://%s:%d/web' % (host, self.port or 443))
-            self.url_prefix_short = ('https://%s:%d'
-                                     % (host, self.port or 443))
-            error = self._reset_session()
-            if error is None:
-                break
-            self.error_msg += '%s: %s\n' % (host, error)
+            # The current node is the last one in the rotation
+            rotation.pop()
+        healthy = [idx for idx in rotation
+                   if (self._node_health[idx]['fail_streak'] <
+                       self.NODE_FAIL_THRESHOLD)]
+        unhealthy = [idx for idx in rotation if idx not in healthy]
+        # Nodes without a measured latency sort first so they get tried.
+        healthy.sort(key=lambda idx: self._node_health[idx]['ewma_latency'])
+        return healthy + unhealthy
+
+    def _update_node_health(self, node_idx, elapsed=None):
+        ''' Update the health of a CVP node after a request.
+
+            Args:
+                node_idx (int): Index of the node the request was sent to.
+                elapsed (float): Duration in seconds of a successful request.
+                    None indicates that the request failed. Default is None.
+        '''
+        health = self._node_health[node_idx]
+        if elapsed is None:
+            health['fail_streak'] += 1
+            return
+        health['fail_streak'] = 0
+        if health['ewma_latency']:
+            health['ewma_latency'] += (self.NODE_LATENCY_WEIGHT *
+                                       (elapsed - health['ewma_latency']))
+        else:
+            health['ewma_latency'] = elapsed
+
+    def _new_session(self):
+        ''' Return a new requests session with a connection pool mounted
+            for https.  At least one pool is kept per CVP node so failing
+            over between nodes does not drop kept-alive connections.  If
+            use_http2 is set an HTTP/2 session using httpx is returned.
+        '''
+        if self.use_http2:
+            return cvp_http2.Http2Session(self.cert, self._pool_maxsize)
+        session = requests.Session()
+        session.mount('https://', self._new_adapter())
+        return session
+
+    def _new_login_session(self):
+        ''' Return a session with its own cookies to send one of several
+            concurrent logins with.  It sends the requests over the
+            connections of the HTTP session.
+        '''
+        if self.use_http2:
+            return self._http_session.fork()
+        session = requests.Session()
+        session.verify = self.cert
+        session.mount('https://', self._http_session.get_adapter('https://'))
+        return session
+
+    def _new_adapter(self):
+        ''' Return a new HTTPAdapter sized for the CVP nodes and the number
+            of concurrent requests.
+        '''
+        pool_connections = max(self.POOL_CONNECTIONS, len(self.nodes or []))
+        return _KeepAliveAdapter(pool_connections=pool_connections,
+                                 pool_maxsize=self._pool_maxsize,
+                                 max_retries=0)
+
+    def _grow_connection_pool(self, maxsize):
+        ''' Make sure the session keeps up to maxsize connections per CVP
+            node so concurrent requests do not open and discard extra
+            connections.  The adapter that is replaced is closed once no
+            request can still be using it.
+
+            Args:
+                maxsize (int): Number of connections needed per node.
+        '''
+        with self._session_lock:
+            if maxsize <= self._pool_maxsize:
+                return
+            self._pool_maxsize = maxsize
+            # HTTP/2 sends concurrent requests over a single connection.
+            if self._http_session is None or self.use_http2:
+                return
+            self._retired_adapters.append(
+                self._http_session.adapters['https://'])
+            self._http_session.mount('https://', self._new_adapter())
+            self._close_retired_adapters()
+
+    def _close_retired_adapters(self):
+        ''' Close the adapters replaced by _grow_connection_pool if there is
+            no request in flight that may still be sending through them.
+            Must be called with the session lock held.
+        '''
+        if self._requests_in_flight:
+            return
+        for adapter in self._retired_adapters:
+            adapter.close()
+        del self._retired_adapters[:]
+
+    def _clear_http_session(self):
+        ''' Create the underlying requests session if needed or drop the
+            cookies of the previous login.  An HTTP/2 session verifies the
+            certificate given when it was created, so it is replaced if
+            connect() was called with a different cert.
+        '''
+        if (self.use_http2 and self._http_session is not None and
+                self._http_session.verify != self.cert):
+            self._http_session.close()
+            self._http_session = None
+        if self._http_session is None:
+            self._http_session = self._new_session()
+        else:
+            self._http_session.cookies.clear()
 
     def _reset_session(self):
-        ''' Get a new request session and try logging into the current
+        ''' Clear the request session and try logging into the current
             CVP node. If the login succeeded None will be returned and
             self.session will be valid. If the login failed then an
             exception error will be returned and self.session will
             be set to None.
+
+            The underlying requests session is created once and reused so
+            that kept-alive connections survive a relogin or a failover.
         '''
-        self.session = requests.Session()
-        return_error = None
-        try:
-            self._login()
-        except (ConnectionError, CvpApiError, CvpRequestError,
-                CvpSessionLogOutError, HTTPError, ReadTimeout, Timeout,
-                TooManyRedirects) as error:
-            self.log.error(error)
-            # Use outer scope var for return to handle
-            # Python 3 UnboundLocalError
-            return_error = error
-            # Any error that occurs during login is a good reason not to use
-            # this CVP node.
-            self.session = None
-        return return_error
+        with self._session_lock:
+            self._session_generation += 1
+            self._clear_http_session()
+            self.session = self._http_session
+            return_error = None
+            try:
+                self._login()
+            except _LOGIN_ERRORS as error:
+                self.log.error(error)
+                # Use outer scope var for return to handle
+                # Python 3 UnboundLocalError
+                return_error = error
+                # Any error that occurs during login is a good reason not to
+                # use this CVP node.
+                self.session = None
+            return return_error
+
+    def _session_state(self):
+        ''' Return a snapshot of the session, cookies, headers and node to
+            send a request with.  If another thread is replacing the session
+            this waits for it to finish so a request is never sent with a
+            half updated session.
+
+            Returns:
+                A _SessionState.
+
+            Raises:
+                ValueError: A ValueError is raised when there is no valid
+                    CVP session.
+        '''
+        with self._session_lock:
+            if not self.session:
+                raise ValueError('No valid session to CVP node')
+            return _SessionState(self._session_generation, self.session,
+                                 self.cookies, dict(self.headers),
+                                 self._file_headers, self._node_idx,
+                                 self.url_prefix, self.url_prefix_short)
+
+    def _renew_session(self, state, failover=False):
+        ''' Login again after a request sent with state failed.  If failover
+            is True then login to another CVP node, otherwise to the same
+            node.  Nothing is done if another thread already replaced the
+            session or is failing over, in which case the request is retried
+            with the session that thread created.
+
+            Args:
+                state (_SessionState): The session the request was sent with.
+                failover (bool): Move to another CVP node. Default is False.
+
+            Returns:
+                True if there is a valid session to retry the request with.
+        '''
+        with self._session_lock:
+            unchanged = self._session_generation == state.generation
+            if not failover:
+                if unchanged:
+                    self._reset_session()
+                return bool(self.session)
+            # Fail over unless another thread already moved to another
+            # node or already failed to find one.
+            if not unchanged and not (self.session and
+                                      self._node_idx == state.node_idx):
+                return bool(self.session)
+            failover_done = self._failover_done
+            if failover_done is None:
+                failover_done = self._failover_done = threading.Event()
+                owner = True
+            else:
+                owner = False
+        if owner:
+            # The failover logs in without holding the session lock. The
+            # other threads that need it wait for it to finish.
+            try:
+                self._create_session()
+            finally:
+                with self._session_lock:
+                    self._failover_done = None
+                failover_done.set()
+        else:
+            failover_done.wait()
+        with self._session_lock:
+            return bool(self.session)
+
+    def _backoff_delay(self, attempt, response=None):
+        ''' Return the number of seconds to wait before retrying a request.
+            If the response is a 503 with a Retry-After header then the
+            server provided delay is used, otherwise an exponential backoff
+            with jitter based on the attempt number is computed.
+
+            Args:
+                attempt (int): Zero based number of the failed attempt.
+                response (Response): The response of the failed attempt if
+                    one was received. Default is None.
+
+            Returns:
+                The delay in seconds.
+        '''
+        if response is not None and response.status_code == 503:
+            retry_after = _parse_retry_after(
+                response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return min(self.BACKOFF_MAX, retry_after)
+        delay = min(self.BACKOFF_MAX,
+                    self.BACKOFF_BASE * self.BACKOFF_FACTOR ** attempt)
+        return delay * (1 + random.uniform(0, self.BACKOFF_JITTER))
+
+    def _sleep_backoff(self, attempt, response=None):
+        ''' Sleep before retrying a request to the same CVP node.
+
+            Args:
+                attempt (int): Zero based number of the failed attempt.
+                response (Response): The response of the failed attempt if
+                    one was received. Default is None.
+        '''
+        delay = self._backoff_delay(attempt, response)
+        self.log.debug('Retrying request in %.2f seconds', delay)
+        time.sleep(delay)
 
     def _is_good_response(self, response, prefix):
         ''' Check for errors in a response from a GET or POST request.
@@ -400,13 +962,19 @@ class CvpClient(object):
             request.  The prefix argument contains the prefix to put into the
             error message.
 
+            Returns:
+                The decoded JSON response. See _decode_response.
+
             Raises:
                 CvpApiError: A CvpApiError is raised if there was a JSON error.
                 CvpRequestError: A CvpRequestError is raised if the request
                     is not properly constructed.
                 CvpSessionLogOutError: A CvpSessionLogOutError is raised if
                     response from server indicates session was logged out.
+                JSONDecodeError: A JSONDecodeError is raised when the response
+                    content contains invalid JSON.
         '''
+        content = response.content or b''
         if not response.ok:
             if 'Unauthorized' in response.reason:
                 # Check for 'Unauthorized' User error because this is how
@@ -414,7 +982,7 @@ class CvpClient(object):
                 msg = '%s: Request Error: %s' % (prefix, response.reason)
                 self.log.error(msg)
                 raise CvpApiError(msg)
-            if 'User is unauthorized' in response.text:
+            if _UNAUTH_SENTINEL in content:
                 # Check for 'User is unauthorized' response text because this
                 # is how CVP responds to a logged out users requests in 2019.x.
                 msg = '%s: Request Error: User is unauthorized' % prefix
@@ -426,11 +994,13 @@ class CvpClient(object):
                 self.log.error(msg)
                 raise CvpRequestError(msg)
 
-        if 'LOG OUT MESSAGE' in response.text:
+        if _LOGOUT_SENTINEL in content:
             msg = ('%s: Request Error: session logged out' % prefix)
             raise CvpSessionLogOutError(msg)
 
-        joutput = json_decoder(response.text)
+        # Decode the body that was already read instead of going through
+        # response.json() which would decode it to text first.
+        joutput = self._decode_response(content)
         err_code_val = self._finditem(joutput, 'errorCode')
         if err_code_val:
             if 'errorMessage' in joutput:
@@ -441,13 +1011,56 @@ class CvpClient(object):
                 else:
                     error_list = [joutput['errorCode']]
                 # Build the error message from all the errors.
-                err_msg = error_list[0]
-                for idx in range(1, len(error_list)):
-                    err_msg = '%s\n%s' % (err_msg, error_list[idx])
+                err_msg = '\n'.join(str(error) for error in error_list)
 
             msg = ('%s: Request Error: %s' % (prefix, err_msg))
             self.log.error(msg)
             raise CvpApiError(msg)
+        return joutput
+
+    def _decode_response(self, content):
+        ''' Decode the JSON content of a response from a GET or POST request.
+
+            Args:
+                content (bytes): The raw body of the response.
+
+            Returns:
+                The decoded JSON. Empty content is returned as a dictionary
+                with key "data" set to an empty list. Content with multiple
+                JSON objects, as returned by the Resource APIs that use
+                Stream JSON format, is returned as a dictionary with key
+                "data" set to the result of json_decoder, which keeps the
+                objects before the first invalid one.
+
+            Raises:
+                JSONDecodeError: A JSONDecodeError is raised when the response
+                    content does not start with a valid JSON object.
+        '''
+        # Added check for response.content being 'null' because of the
+        # service account APIs being a special case /services/ API that
+        # returns a null string for no objects instead of an empty string.
+        if not content or content == b'null':
+            return {'data': []}
+
+        try:
+            return json_loads(content)
+        except json.JSONDecodeError as error:
+            # Truncate long error messages
+            err_str = str(error)
+            if len(err_str) > 700:
+                err_str = f"{err_str[:300]}[... truncated ...]" \
+                          f" {err_str[-300:]}"
+            self.log.debug('Error trying to decode request response - %s',
+                           err_str)
+            if 'Extra data' in str(error):
+                # Resource APIs use Stream JSON format and return one JSON
+                # object after another. Return the objects that decode.
+                self.log.debug('Found multiple objects or NO objects in'
+                               'response data. Attempt to decode')
+                return {'data': json_decoder(content)}
+            self.log.error('Unknown format for JSONDecodeError - %s',
+                           err_str)
+            raise JSONDecodeError(error.msg, error.doc, error.pos) from error
 
     def _check_response_status(self, response, prefix):
         ''' Check for status OK in a response from a GET or POST request.
@@ -493,14 +1106,23 @@ class CvpClient(object):
         '''
         # Remove any previous session id from the headers
         self.headers.pop('APP_SESSION_ID', None)
-        if self.api_token is not None:
-            return self._set_headers_api_token()
-        elif self.is_cvaas:
-            raise CvpLoginError('CVaaS only supports API token authentication.'
-                                ' Please create an API token and provide it'
-                                ' via the api_token parameter in combination'
-                                ' with the is_cvaas parameter')
-        return self._login_on_prem()
+        try:
+            if self.api_token is not None:
+                return self._set_headers_api_token()
+            elif self.is_cvaas:
+                raise CvpLoginError(_CVAAS_LOGIN_MSG)
+            return self._login_on_prem()
+        finally:
+            self._update_file_headers()
+
+    def _update_file_headers(self):
+        ''' Copy the headers needed for file uploads from self.headers.
+            Called whenever the session id or API token headers change.
+        '''
+        self._file_headers = {key: self.headers[key]
+                              for key in ('Accept', 'APP_SESSION_ID',
+                                          'Authorization')
+                              if key in self.headers}
 
     def _login_on_prem(self):
         ''' Make a POST request to CVP login authentication.
@@ -528,16 +1150,10 @@ class CvpClient(object):
                     request failed and no session could be established to a
                     CVP node.  Destroy the class and re-instantiate.
         '''
-        url = self.url_prefix + '/login/authenticate.do'
-        response = self.session.post(url,
-                                     data=json.dumps(self.authdata),
-                                     headers=self.headers,
-                                     timeout=self.connect_timeout,
-                                     verify=self.cert)
-        self._is_good_response(response, 'Authenticate: %s' % url)
+        response, joutput = self._try_login(self._node_idx)
 
         self.cookies = response.cookies
-        self.headers['APP_SESSION_ID'] = response.json()['sessionId']
+        self.headers['APP_SESSION_ID'] = joutput['sessionId']
 
     def _set_headers_api_token(self):
         ''' Sets headers with API token instead of making a call to login API.
@@ -557,13 +1173,16 @@ class CvpClient(object):
         response = self.post('/login/logout.do')
         if response['data'] == 'success':
             self.log.info('User logged out.')
-            self.session = None
+            self._stop_keepalive()
+            with self._session_lock:
+                self._session_generation += 1
+                self.session = None
         else:
             err = 'Error trying to logout %s' % response
             self.log.error(err)
 
     def _make_request(self, req_type, url, timeout, data=None,
-                      files=None):
+                      files=None, raw_body=None):
         ''' Make a GET, POST or DELETE request to CVP.  If the request call raises a
             timeout or CvpSessionLogOutError then the request will be retried
             on the same CVP node.  Otherwise the request will be tried on the
@@ -578,6 +1197,8 @@ class CvpClient(object):
                     the request. Default is None.
                 files (dict): Dict of file name to files for upload. Currently
                     only used for adding images to CVP. Default is None.
+                raw_body (bytes or str): Already JSON serialized body to send
+                    instead of serializing data. Default is None.
 
             Returns:
                 The JSON response.
@@ -608,58 +1229,81 @@ class CvpClient(object):
                     multiple object or in the case where the response contains
                     incomplete JSON.
         '''
+        # pylint: disable=too-many-arguments
+        # Let the keepalive thread know the session is in use.
+        with self._session_lock:
+            self._requests_in_flight += 1
+        try:
+            return self._make_request_with_failover(req_type, url, timeout,
+                                                    data, files, raw_body)
+        finally:
+            with self._session_lock:
+                self._requests_in_flight -= 1
+                self._close_retired_adapters()
+
+    def _make_request_with_failover(self, req_type, url, timeout, data,
+                                    files, raw_body):
+        ''' Send the request of _make_request, retrying it on the other CVP
+            nodes if needed.  See _make_request for the arguments, return
+            value and errors.
+        '''
         # pylint: disable=too-many-branches
         # pylint: disable=too-many-statements
         # pylint: disable=too-many-arguments
         # pylint: disable=raising-bad-type
-        if not self.session:
-            raise ValueError('No valid session to CVP node')
+        state = self._session_state()
+        if req_type != 'GET' and self._get_cache:
+            # A change on CVP may make the cached GET responses stale.
+            self.clear_cache()
         # Keep note of which node is handling this request.
-        self._last_used_node = re.match('http[s]?://(.*):',
-                                        self.url_prefix).group(1)
+        self._last_used_node = self._current_host
         # Retry the request for the number of nodes.
         response = None
+        resp_data = None
+        # Serialize the body once for all of the retries and failovers.
+        body = raw_body
+        if body is None and req_type in ('POST', 'DELETE') and files is None:
+            body = json_dumps(data)
+        # Work out the path and which URL prefix it uses once. Only the
+        # node part of the URL changes when failing over.
+        request_path = self._request_path(url)
         for node_num in range(self.node_cnt):
-            # Set full URL based on current node
-            if '/api/' in url or '/cvpservice/' in url:
-                full_url = self.url_prefix_short + url
-            elif self.is_cvaas:
-                # For CVaaS use cvpservice instead of web or api
-                full_url = self.url_prefix_short + '/cvpservice' + url
-            else:
-                full_url = self.url_prefix + url
+            if node_num:
+                state = self._session_state()
+            start = time.monotonic()
             try:
-                response = self._send_request(req_type, full_url, timeout,
-                                              data, files)
+                # Set full URL based on the node of the session
+                response, resp_data = self._send_request(
+                    req_type, self._node_url(state, request_path), timeout,
+                    body, files, state)
             except CvpApiError as error:
                 # If this is not an Unauthorized CvpApiError raise the error
-                # 'Unauthorized' is for 2018.x
-                # 'User is unauthorized' is for 2019.x
-                if ('Unauthorized' not in error.msg and
-                        'User is unauthorized' not in error.msg):
+                if not _UNAUTH_RE.search(error.msg):
                     raise error
+                self._update_node_health(state.node_idx)
                 # If this is the final CVP node raise error
                 if node_num + 1 == self.node_cnt:
                     raise error
                 # Create a new session to retry on another CVP node.
-                self._create_session()
                 # Verify that we can connect to at least one node
                 # otherwise raise the last error
-                if not self.session:
+                if not self._renew_session(state, failover=True):
                     raise error
                 continue
             except (ConnectionError, HTTPError, TooManyRedirects, ReadTimeout,
                     Timeout, CvpSessionLogOutError) as error:
+                self._update_node_health(state.node_idx)
                 # If this is the final CVP node raise error
                 if node_num + 1 == self.node_cnt:
                     raise error
                 # Create a new session to retry on another CVP node.
-                self._create_session()
                 # Verify that we can connect to at least one node
                 # otherwise raise the last error
-                if not self.session:
+                if not self._renew_session(state, failover=True):
                     raise error
                 continue
+            self._update_node_health(state.node_idx,
+                                     time.monotonic() - start)
             break
 
         if not response:
@@ -667,46 +1311,56 @@ class CvpClient(object):
                            req_type, url)
             return None
 
-        # Added check for response.content being 'null' because of the
-        # service account APIs being a special case /services/ API that
-        # returns a null string for no objects instead of an empty string.
-        if not response.content or response.content == b'null':
-            return {'data': []}
+        if ('/resources/' in url and resp_data is not None
+                and 'result' in resp_data):
+            # Resource APIs use JSON streaming and will return
+            # multiple JSON objects during GetAll type API
+            # calls. We are wrapping the multiple objects into
+            # a key "data" and we also return a dictionary with
+            # key "data" as an empty dict for no data. This
+            # checks and keeps consistent the "data" key wrapper
+            # for a Resource API GetAll that returns a single
+            # object.
+            return {'data': [resp_data]}
+        return resp_data
+
+    def _request_path(self, url):
+        ''' Return the path to request for url and whether it goes after
+            the short URL prefix (without /web) of the node.
 
-        try:
-            resp_data = response.json()
-            if (resp_data is not None and 'result' in resp_data
-                    and '/resources/' in full_url):
-                # Resource APIs use JSON streaming and will return
-                # multiple JSON objects during GetAll type API
-                # calls. We are wrapping the multiple objects into
-                # a key "data" and we also return a dictionary with
-                # key "data" as an empty dict for no data. This
-                # checks and keeps consistent the "data" key wrapper
-                # for a Resource API GetAll that returns a single
-                # object.
-                return {'data': [resp_data]}
-            return resp_data
-        except JSONDecodeError as error:
-            # Truncate long error messages
-            err_str = str(error)
-            if len(err_str) > 700:
-                err_str = f"{err_str[:300]}[... truncated ...]" \
-                          f" {err_str[-300:]}"
-            self.log.debug('Error trying to decode request response - %s',
-                           err_str)
-            if 'Extra data' in str(error):
-                self.log.debug('Found multiple objects or NO objects in'
-                               'response data. Attempt to decode')
-                decoded_data = json_decoder(response.text)
-                return {'data': decoded_data}
-            else:
-                self.log.error('Unknown format for JSONDecodeError - %s',
-                               err_str)
-                raise error
+            Args:
+                url (str): Portion of request URL that comes after the host.
+
+            Returns:
+                A tuple of the path and a boolean that is True if the path
+                uses url_prefix_short instead of url_prefix.
+        '''
+        if '/api/' in url or '/cvpservice/' in url:
+            return url, True
+        if self.is_cvaas:
+            # For CVaaS use cvpservice instead of web or api
+            return '/cvpservice' + url, True
+        return url, False
 
-    def _send_request(self, req_type, full_url, timeout, data=None,
-                      files=None):
+    @staticmethod
+    def _node_url(state, request_path):
+        ''' Return the full URL of a request on the node of a session.
+
+            Args:
+                state (_SessionState): The session the request is sent with.
+                request_path (tuple): The path and URL prefix flag returned
+                    by _request_path.
+
+            Returns:
+                The full URL of the request.
+        '''
+        path, use_short_prefix = request_path
+        if use_short_prefix:
+            return state.url_prefix_short + path
+        return state.url_prefix + path
+
+    def _send_request(self, req_type, full_url, timeout, body=None,
+                      files=None, state=None):
         ''' Make a GET, POST or DELETE request to CVP.  If the request call
             raises a timeout or CvpSessionLogOutError then the request will be
             retried on the same CVP node.  Otherwise the request will be tried
@@ -718,13 +1372,15 @@ class CvpClient(object):
                     host.
                 timeout (int): Number of seconds the client will wait between
                     bytes sent from the server.
-                data (dict): Dict of key/value pairs to pass as parameters into
-                    the request. Default is None.
+                body (bytes or str): The JSON serialized body of a POST or
+                    DELETE request. Default is None.
                 files (dict): Dict of file name to files for upload. Currently
                     only used for adding images to CVP. Default is None.
+                state (_SessionState): The session to send the request with.
+                    Default is the current session.
 
             Returns:
-                The JSON response.
+                A tuple of the response object and the decoded JSON response.
 
             Raises:
                 ConnectionError: A ConnectionError is raised if there was a
@@ -753,44 +1409,51 @@ class CvpClient(object):
         # pylint: disable=raising-bad-type
         # For get or post requests apply both the connect and read timeout.
         timeout = (self.connect_timeout, timeout)
+        if state is None:
+            state = self._session_state()
         for req_try in range(self.NUM_RETRY_REQUESTS):
+            session = state.session
             try:
                 if req_type == 'GET':
-                    response = self.session.get(full_url,
-                                                cookies=self.cookies,
-                                                headers=self.headers,
-                                                timeout=timeout,
-                                                verify=self.cert)
+                    response = session.get(full_url,
+                                           cookies=state.cookies,
+                                           headers=state.headers,
+                                           timeout=timeout,
+                                           verify=self.cert)
                 elif req_type == 'POST':
                     if files is None:
-                        response = self.session.post(full_url,
-                                                     cookies=self.cookies,
-                                                     data=json.dumps(data),
-                                                     headers=self.headers,
-                                                     timeout=timeout,
-                                                     verify=self.cert)
+                        response = session.post(full_url,
+                                                cookies=state.cookies,
+                                                data=body,
+                                                headers=state.headers,
+                                                timeout=timeout,
+                                                verify=self.cert)
+                    elif MultipartEncoder is None:
+                        response = session.post(full_url,
+                                                cookies=state.cookies,
+                                                headers=state.file_headers,
+                                                timeout=timeout,
+                                                verify=self.cert,
+                                                files=files)
                     else:
-                        fhs = dict()
-                        fhs['Accept'] = self.headers['Accept']
-                        if 'APP_SESSION_ID' in self.headers:
-                            fhs['APP_SESSION_ID'] = self.headers[
-                                'APP_SESSION_ID']
-                        if 'Authorization' in self.headers:
-                            fhs['Authorization'] = self.headers[
-                                'Authorization']
-                        response = self.session.post(full_url,
-                                                     cookies=self.cookies,
-                                                     headers=fhs,
-                                                     timeout=timeout,
-                                                     verify=self.cert,
-                                                     files=files)
+                        # Stream the upload from the files instead of
+                        # building the whole multipart body in memory.
+                        encoder = _multipart_encoder(files)
+                        fhs = dict(state.file_headers)
+                        fhs['Content-Type'] = encoder.content_type
+                        response = session.post(full_url,
+                                                cookies=state.cookies,
+                                                data=encoder,
+                                                headers=fhs,
+                                                timeout=timeout,
+                                                verify=self.cert)
                 elif req_type == 'DELETE':
-                    response = self.session.delete(full_url,
-                                                   cookies=self.cookies,
-                                                   data=json.dumps(data),
-                                                   headers=self.headers,
-                                                   timeout=timeout,
-                                                   verify=self.cert)
+                    response = session.delete(full_url,
+                                              cookies=state.cookies,
+                                              data=body,
+                                              headers=state.headers,
+                                              timeout=timeout,
+                                              verify=self.cert)
             except (ConnectionError, HTTPError, TooManyRedirects) as error:
                 # Any of these errors is a good reason to try another CVP node
                 self.log.error(error)
@@ -802,11 +1465,23 @@ class CvpClient(object):
                 # try raise the error so another CVP node can be tried
                 if req_try + 1 == self.NUM_RETRY_REQUESTS:
                     raise error
+                self._sleep_backoff(req_try)
+                continue
+
+            if (response is not None and
+                    response.status_code in self.RETRY_STATUS_CODES and
+                    req_try + 1 < self.NUM_RETRY_REQUESTS):
+                # The node is temporarily unable to handle the request.
+                # Back off and retry the request to the same node. On the
+                # final try fall through so the error is raised below.
+                self.log.debug('%s: %s returned status %s', req_type,
+                               full_url, response.status_code)
+                self._sleep_backoff(req_try, response)
                 continue
 
             try:
-                self._is_good_response(response, '%s: %s ' %
-                                       (req_type, full_url))
+                resp_data = self._is_good_response(response, '%s: %s ' %
+                                                   (req_type, full_url))
             except CvpSessionLogOutError as error:
                 self.log.debug(error)
                 # Retry the request to the same node if there was a CVP session
@@ -816,14 +1491,13 @@ class CvpClient(object):
                 if req_try + 1 == self.NUM_RETRY_REQUESTS:
                     raise error
                 else:
-                    self._reset_session()
-                    if not self.session:
+                    if not self._renew_session(state):
                         raise error
+                    state = self._session_state()
                     continue
             except CvpApiError as error:
                 self.log.debug(error)
-                if ('Unauthorized' in error.msg or
-                        'User is unauthorized' in error.msg):
+                if _UNAUTH_RE.search(error.msg):
                     # Retry the request to the same node if there was an
                     # Unauthorized User error because this is how CVP responds
                     # to a logged out users requests in 2017.1.
@@ -835,14 +1509,14 @@ class CvpClient(object):
                     if req_try + 1 == self.NUM_RETRY_REQUESTS:
                         raise error
                     else:
-                        self._reset_session()
-                        if not self.session:
+                        if not self._renew_session(state):
                             raise error
+                        state = self._session_state()
                         continue
                 else:
                     # pylint: disable=raising-bad-type
                     raise error
-            return response
+            return response, resp_data
 
     def get(self, url, timeout=30):
         ''' Make a GET request to CVP.  If the request call raises an error
@@ -878,9 +1552,42 @@ class CvpClient(object):
                     established to a CVP node.  Destroy the class and
                     re-instantiate.
         '''
-        return self._make_request('GET', url, timeout)
+        if not self._is_cacheable(url):
+            return self._make_request('GET', url, timeout)
+        now = time.monotonic()
+        with self._get_cache_lock:
+            entry = self._get_cache.get(url)
+        if entry is not None and entry[0] > now:
+            # The response is kept serialized and each hit decodes its own
+            # copy, so callers can modify it without changing the cache.
+            # Decoding is much cheaper than copy.deepcopy of a large
+            # inventory.
+            return json_loads(entry[1])
+        resp_data = self._make_request('GET', url, timeout)
+        entry = (now + self.GET_CACHE_TTL, json_dumps(resp_data))
+        with self._get_cache_lock:
+            self._get_cache[url] = entry
+            if len(self._get_cache) > self.GET_CACHE_SIZE:
+                # Drop the oldest entry
+                del self._get_cache[next(iter(self._get_cache))]
+        return resp_data
+
+    def _is_cacheable(self, url):
+        ''' Return True if GET responses for url are cached.
+
+            Args:
+                url (str): Portion of request URL that comes after the host.
+        '''
+        return (self.GET_CACHE_TTL > 0 and
+                any(part in url for part in self.GET_CACHE_URLS))
+
+    def clear_cache(self):
+        ''' Drop all cached GET responses.
+        '''
+        with self._get_cache_lock:
+            self._get_cache.clear()
 
-    def post(self, url, data=None, files=None, timeout=30):
+    def post(self, url, data=None, files=None, timeout=30, raw_body=None):
         ''' Make a POST request to CVP.  If the request call raises an error
             or if the JSON response contains a CVP session related error then
             retry the request on another CVP node.
@@ -893,6 +1600,9 @@ class CvpClient(object):
                     only used for adding images to CVP. Default is None.
                 timeout (int): Number of seconds the client will wait between
                     bytes sent from the server.  Default value is 30 seconds.
+                raw_body (bytes or str): Already JSON serialized body to send
+                    instead of data.  Lets callers posting the same payload
+                    many times serialize it only once.  Default is None.
 
             Returns:
                 The JSON response.
@@ -918,7 +1628,8 @@ class CvpClient(object):
                     established to a CVP node.  Destroy the class and
                     re-instantiate.
         '''
-        return self._make_request('POST', url, timeout, data=data, files=files)
+        return self._make_request('POST', url, timeout, data=data, files=files,
+                                  raw_body=raw_body)
 
     def delete(self, url, data=None, timeout=30):
         ''' Make a DELETE request to CVP.  If the request call raises an error
@@ -958,6 +1669,111 @@ class CvpClient(object):
         '''
         return self._make_request('DELETE', url, timeout, data=data)
 
+    def get_stream(self, url, timeout=30):
+        ''' Make a GET request to a Resource API that returns Stream JSON
+            and yield each object as it is received, instead of reading and
+            decoding the whole response first.  Unlike get, the request is
+            not retried or sent to another CVP node.
+
+            Args:
+                url (str): Portion of request URL that comes after the host.
+                timeout (int): Number of seconds the client will wait between
+                    bytes sent from the server.  Default value is 30 seconds.
+
+            Yields:
+                Each JSON object of the response.
+
+            Raises:
+                ConnectionError: A ConnectionError is raised if there was a
+                    network problem (e.g. DNS failure, refused connection, etc)
+                CvpApiError: A CvpApiError is raised if there was a JSON error.
+                CvpRequestError: A CvpRequestError is raised if the request
+                    is not properly constructed.
+                CvpSessionLogOutError: A CvpSessionLogOutError is raised if
+                    response from server indicates session was logged out.
+                JSONDecodeError: A JSONDecodeError is raised when a line of
+                    the response is not a valid JSON object.
+                ReadTimeout: A ReadTimeout is raised if there was a request
+                    timeout when reading from the connection.
+                ValueError: A ValueError is raised when there is no valid
+                    CVP session.
+        '''
+        state = self._session_state()
+        self._last_used_node = self._current_host
+        full_url = self._node_url(state, self._request_path(url))
+        prefix = 'GET: %s ' % full_url
+        # Count the stream as a request in flight while it is read.
+        with self._session_lock:
+            self._requests_in_flight += 1
+        response = None
+        try:
+            response = state.session.get(
+                full_url, cookies=state.cookies, headers=state.headers,
+                timeout=(self.connect_timeout, timeout), verify=self.cert,
+                stream=True)
+            if not response.ok:
+                # Reads the body to raise the matching error
+                self._is_good_response(response, prefix)
+            for line in response.iter_lines():
+                if not line.strip():
+                    continue
+                if _LOGOUT_SENTINEL in line:
+                    raise CvpSessionLogOutError(
+                        '%s: Request Error: session logged out' % prefix)
+                try:
+                    yield json_loads(line)
+                except json.JSONDecodeError as error:
+                    self.log.error('%s: Invalid JSON in stream - %s',
+                                   prefix, error)
+                    raise JSONDecodeError(error.msg, error.doc,
+                                          error.pos) from error
+        finally:
+            if response is not None:
+                response.close()
+            with self._session_lock:
+                self._requests_in_flight -= 1
+                self._close_retired_adapters()
+
+    def batch(self, calls, max_inflight=10, timeout=30):
+        ''' Make several independent GET, POST or DELETE requests to CVP
+            concurrently.  At most max_inflight requests are sent at the same
+            time over the pooled session, which is grown to hold
+            max_inflight connections per node if needed.  Each request is
+            retried and failed over the same way as a single get, post or
+            delete.  When several requests fail on the same node at once only
+            the first one logs in to another node and the others are retried
+            on that new session.
+
+            Args:
+                calls (list): List of (req_type, url) or (req_type, url, data)
+                    tuples. req_type is either 'GET', 'POST' or 'DELETE', url
+                    is the portion of request URL that comes after the host
+                    and data is the dict of key/value pairs to pass as
+                    parameters into the request. The data of each call must
+                    not be shared with or modified by another call.
+                max_inflight (int): Maximum number of requests in flight at
+                    the same time. Default is 10.
+                timeout (int): Number of seconds the client will wait between
+                    bytes sent from the server.  Default value is 30 seconds.
+
+            Returns:
+                List of the JSON responses in the same order as calls.
+
+            Raises:
+                The first error, in the order of calls, raised by any of the
+                requests. See get, post and delete for the possible errors.
+        '''
+        def _call(req_type, url, data=None):
+            if req_type == 'GET':
+                # Go through get so the GET cache is used
+                return self.get(url, timeout)
+            return self._make_request(req_type, url, timeout, data=data)
+
+        self._grow_connection_pool(max_inflight)
+        with ThreadPoolExecutor(max_workers=max_inflight) as executor:
+            futures = [executor.submit(_call, *call) for call in calls]
+            return [future.result() for future in futures]
+
     def _finditem(self, obj, key):
         """ Find a key in a a nested list/dict.
 
@@ -968,38 +1784,125 @@ class CvpClient(object):
             Returns:
                 Value of found key or None if not found.
         """
-        item = None
-        if isinstance(obj, dict):
-            if key in obj:
-                item = obj[key]
+        # Walk the object depth first with an explicit stack instead of
+        # recursion. Children are pushed in reverse so they are visited in
+        # their original order. Only dicts and lists are pushed since other
+        # values cannot contain the key.
+        stack = [obj]
+        while stack:
+            cur = stack.pop()
+            if isinstance(cur, dict):
+                if key in cur:
+                    if cur[key] is not None:
+                        return cur[key]
+                    continue
+                children = cur.values()
+            elif isinstance(cur, list):
+                children = cur
             else:
-                for _, value in obj.items():
-                    if isinstance(value, (dict, list)):
-                        item = self._finditem(value, key)
-                        if item is not None:
-                            break
-        elif isinstance(obj, list):
-            for i in obj:
-                if isinstance(i, (dict, list)):
-                    item = self._finditem(i, key)
-                    if item is not None:
-                        break
-        return item
+                continue
+            stack.extend(child for child in reversed(list(children))
+                         if isinstance(child, (dict, list)))
+        return None
 
 
-def json_decoder(data):
-    ''' Check for ...
+def _keepalive(client_ref, stop):
+    ''' Make a request every KEEPALIVE_INTERVAL seconds so the CVP session
+        of the client is not logged out for being idle.  Runs until stop is
+        set or the client is garbage collected.
+
+        Args:
+            client_ref (weakref.ref): Weak reference to the CvpClient.
+            stop (threading.Event): Event set to stop the thread.
     '''
-    decoder = json.JSONDecoder()
-    position = 0
-    decoded_data = []
+    # pylint: disable=protected-access
     while True:
-        try:
-            obj, position = decoder.raw_decode(data, position)
-            decoded_data.append(obj)
-            position += 1
-        except ValueError:
-            break
-    if len(decoded_data) == 1:
-        return decoded_data[0]
-    return decoded_data
+        client = client_ref()
+        if client is None:
+            return
+        interval = client.KEEPALIVE_INTERVAL
+        # Do not keep the client alive while waiting
+        del client
+        if stop.wait(interval):
+            return
+        client = client_ref()
+        if client is None:
+            return
+        # Share the session lock with the requests of the client and skip
+        # the ping if a request is in flight since it keeps the session
+        # alive already.
+        with client._session_lock:
+            idle = client.session and not client._requests_in_flight
+        if idle:
+            try:
+                # Bypass the GET cache so the request reaches CVP
+                client._make_request('GET', client.KEEPALIVE_URL,
+                                     client.api.request_timeout)
+            except Exception as error:  # pylint: disable=broad-except
+                client.log.debug('Keepalive request failed: %s', error)
+        del client
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    ''' HTTPAdapter that turns on TCP keepalive in addition to the urllib3
+        default of disabling Nagle's algorithm (TCP_NODELAY), so idle pooled
+        connections to CVP are not silently dropped by middleboxes.
+    '''
+    SOCKET_OPTIONS = HTTPConnection.default_socket_options + [
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = self.SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
+
+def _multipart_encoder(files):
+    ''' Return a MultipartEncoder that streams the given files.
+
+        Args:
+            files (dict): Dict of field name to either a file object or a
+                (filename, file object[, content type]) tuple, as accepted by
+                the files parameter of requests.
+
+        Returns:
+            A requests_toolbelt MultipartEncoder.
+    '''
+    fields = {}
+    for name, value in files.items():
+        if isinstance(value, (tuple, list)):
+            fileobj = value[1]
+            field = tuple(value)
+        else:
+            fileobj = value
+            filename = os.path.basename(getattr(fileobj, 'name', name))
+            field = (filename, fileobj, 'application/octet-stream')
+        if hasattr(fileobj, 'seek'):
+            # A retried upload must send the file from the start again
+            fileobj.seek(0)
+        fields[name] = field
+    return MultipartEncoder(fields=fields)
+
+
+def _parse_retry_after(value):
+    ''' Parse the value of a Retry-After header.
+
+        Args:
+            value (str): Either a number of seconds or an HTTP-date.
+
+        Returns:
+            The number of seconds to wait or None if the value is invalid.
+    '''
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_date.tzinfo is None:
+        retry_date = retry_date.replace(tzinfo=timezone.utc)
+    delay = (retry_date - datetime.now(timezone.utc)).total_seconds()
+    return max(0.0, delay)
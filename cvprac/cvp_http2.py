@@ -0,0 +1,240 @@
+#
+# Copyright (c) 2017, Arista Networks, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+#   Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+#
+#   Neither the name of Arista Networks nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL ARISTA NETWORKS
+# BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN
+# IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+''' HTTP/2 transport for the CVP RESTful API client
+
+The CvpClient sends its requests with a requests.Session.  When use_http2 is
+set the session is replaced by an Http2Session, which provides the parts of
+the requests API used by CvpClient on top of an httpx client with HTTP/2
+enabled.  httpx needs the h2 module for HTTP/2, which is installed with
+pip install httpx[http2].
+'''
+
+from contextlib import contextmanager
+from importlib.util import find_spec
+
+# pylint: disable=redefined-builtin
+from requests.exceptions import ConnectionError, ReadTimeout, Timeout, \
+    TooManyRedirects
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Checked by CvpClient before an Http2Session is created since httpx only
+# fails for a missing h2 module when the client is created.
+H2_INSTALLED = find_spec('h2') is not None
+
+
+@contextmanager
+def _requests_errors():
+    ''' Raise the httpx errors raised in the block as the equivalent
+        requests errors.
+    '''
+    try:
+        yield
+    except httpx.TooManyRedirects as error:
+        raise TooManyRedirects(str(error)) from error
+    except httpx.ReadTimeout as error:
+        raise ReadTimeout(str(error)) from error
+    except httpx.TimeoutException as error:
+        raise Timeout(str(error)) from error
+    except httpx.TransportError as error:
+        raise ConnectionError(str(error)) from error
+
+
+class Http2Session:
+    ''' Minimal look-alike of requests.Session that sends the requests over
+        an httpx client with HTTP/2 enabled.  Only the parts of the requests
+        API used by CvpClient are provided and httpx errors are raised as
+        the equivalent requests errors.
+    '''
+    def __init__(self, verify, max_connections, transport=None):
+        ''' Create the httpx client.
+
+            Args:
+                verify (str or boolean): Path to a cert file or boolean to
+                    enable or disable verifying the servers TLS certificate.
+                max_connections (int): Maximum number of kept-alive
+                    connections.
+                transport (httpx.BaseTransport): Transport used instead of
+                    the default HTTP/2 transport. Default is None.
+        '''
+        self.verify = verify
+        self._max_connections = max_connections
+        limits = httpx.Limits(max_keepalive_connections=max_connections)
+        if transport is None:
+            transport = httpx.HTTPTransport(http2=True, verify=verify,
+                                            limits=limits)
+        self._transport = transport
+        self._client = httpx.Client(http2=True, verify=verify,
+                                    follow_redirects=True, limits=limits,
+                                    transport=transport)
+
+    def fork(self):
+        ''' Return a session that keeps its own cookies but sends its
+            requests over the connections of this session.  Closing either
+            session closes the connections of both.
+
+            Returns:
+                An Http2Session.
+        '''
+        return Http2Session(self.verify, self._max_connections,
+                            transport=self._transport)
+
+    @property
+    def cookies(self):
+        ''' The cookies kept by the httpx client.
+        '''
+        return self._client.cookies
+
+    def close(self):
+        ''' Close the connections of the httpx client.
+        '''
+        self._client.close()
+
+    def get(self, url, **kwargs):
+        ''' Send a GET request. See request.
+        '''
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        ''' Send a POST request. See request.
+        '''
+        return self.request('POST', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        ''' Send a DELETE request. See request.
+        '''
+        return self.request('DELETE', url, **kwargs)
+
+    def request(self, method, url, cookies=None, headers=None, timeout=None,
+                verify=None, data=None, files=None, stream=False):
+        ''' Send a request with the requests.Session.request arguments.
+            The cookies are sent instead of the cookies kept by the httpx
+            client.  The TLS certificate is verified as set when the
+            session was created, so verify must be None or the same value.
+            If stream is True the body is only read when the response
+            content or lines are accessed.
+
+            Returns:
+                An Http2Response.
+
+            Raises:
+                ValueError: A ValueError is raised if verify differs from the
+                    verify setting of the session.
+        '''
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        if verify is not None and verify != self.verify:
+            raise ValueError('HTTP/2 session created with verify=%r cannot'
+                             ' send a request with verify=%r'
+                             % (self.verify, verify))
+        if cookies:
+            # httpx deprecated per request cookies. A Cookie header takes
+            # precedence over the cookies of the client.
+            headers = dict(headers or {})
+            headers['Cookie'] = '; '.join('%s=%s' % item
+                                          for item in cookies.items())
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        content = data
+        if hasattr(data, 'read'):
+            # Stream file like bodies such as a MultipartEncoder
+            content = iter(lambda: data.read(65536), b'')
+        with _requests_errors():
+            request = self._client.build_request(
+                method, url, headers=headers, content=content, files=files,
+                timeout=timeout)
+            response = self._client.send(request, stream=stream)
+        return Http2Response(response)
+
+
+class Http2Response:
+    ''' Wraps an httpx response to provide the requests.Response attributes
+        used by CvpClient.
+    '''
+    def __init__(self, response):
+        self._response = response
+
+    @property
+    def ok(self):
+        ''' True if the status code is less than 400.
+        '''
+        return self._response.status_code < 400
+
+    @property
+    def reason(self):
+        ''' The HTTP reason phrase.
+        '''
+        return self._response.reason_phrase
+
+    @property
+    def content(self):
+        ''' The body as bytes. A streamed body is read first.
+        '''
+        with _requests_errors():
+            return self._response.read()
+
+    @property
+    def text(self):
+        ''' The body decoded to text. A streamed body is read first.
+        '''
+        with _requests_errors():
+            self._response.read()
+        return self._response.text
+
+    def __bool__(self):
+        return self.ok
+
+    def iter_lines(self):
+        ''' Iterate over the lines of the body as bytes like
+            requests.Response.iter_lines.  A streamed body is read as the
+            lines are consumed.
+        '''
+        pending = None
+        with _requests_errors():
+            for chunk in self._response.iter_bytes():
+                if pending is not None:
+                    chunk = pending + chunk
+                lines = chunk.splitlines()
+                # Keep a last line that is not terminated by a newline for
+                # the next chunk.
+                if lines and chunk[-1:] not in (b'\n', b'\r'):
+                    pending = lines.pop()
+                else:
+                    pending = None
+                yield from lines
+        if pending is not None:
+            yield pending
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
@@ -0,0 +1,147 @@
+#
+# Copyright (c) 2017, Arista Networks, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+#   Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+#
+#   Neither the name of Arista Networks nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL ARISTA NETWORKS
+# BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN
+# IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+''' JSON encoding and decoding for the CVP RESTful API client
+
+The orjson module is used when it is installed since it is much faster than
+the standard library json module, which is used otherwise and for the
+documents that orjson rejects.
+'''
+
+import json
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Used to decode Stream JSON that is not one object per line. The decoder
+# keeps no state between calls so a single instance is shared.
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def json_dumps(data):
+    ''' Serialize data to a JSON request body. Uses orjson when it is
+        installed and the standard library json module otherwise.
+
+        Args:
+            data: The object to serialize.
+
+        Returns:
+            The compact JSON document as UTF-8 bytes, which requests sends
+            as is.
+    '''
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    # Match the orjson output: no spaces after separators and no escaping
+    # of non-ASCII characters.
+    return json.dumps(data, separators=(',', ':'),
+                      ensure_ascii=False).encode('utf-8')
+
+
+def json_loads(data):
+    ''' Deserialize a JSON document. Uses orjson when it is installed and
+        the standard library json module otherwise, or if orjson rejects
+        the document.
+
+        Args:
+            data (bytes or str): The JSON document.
+
+        Returns:
+            The decoded object.
+
+        Raises:
+            json.JSONDecodeError: Raised by the json module if data is not a
+                valid JSON document.
+    '''
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # The json module accepts more than orjson, such as NaN, and its
+            # error tells apart extra data after a valid document.
+            pass
+    return json.loads(data)
+
+
+def _decode_json_stream(data):
+    ''' Decode consecutive JSON objects separated by optional whitespace.
+
+        Args:
+            data (bytes or str): The Stream JSON content.
+
+        Returns:
+            A tuple of the list of decoded objects and a flag that is True
+            if all of data was decoded.
+    '''
+    if orjson is not None:
+        # The Resource APIs send one JSON object per line so each line can
+        # be decoded by orjson on its own. Fall back to scanning the content
+        # for objects that are not split by newlines.
+        try:
+            return ([orjson.loads(line) for line in data.splitlines()
+                     if line.strip()], True)
+        except orjson.JSONDecodeError:
+            pass
+    if isinstance(data, bytes):
+        data = data.decode('utf-8', 'replace')
+    end = len(data)
+    position = 0
+    decoded_data = []
+    while True:
+        position = _JSON_WHITESPACE.match(data, position).end()
+        if position == end:
+            break
+        try:
+            obj, position = _JSON_DECODER.raw_decode(data, position)
+        except ValueError:
+            break
+        decoded_data.append(obj)
+    return decoded_data, position == end
+
+
+def json_decoder(data):
+    ''' Decode Stream JSON content made of consecutive JSON objects.
+        Decoding stops at the first invalid object.
+
+        Args:
+            data (bytes or str): The Stream JSON content.
+
+        Returns:
+            The decoded object if there is only one, otherwise the list of
+            decoded objects.
+    '''
+    decoded_data, _ = _decode_json_stream(data)
+    if len(decoded_data) == 1:
+        return decoded_data[0]
+    return decoded_data
@@ -36,8 +36,12 @@ The DUT is a CVP node.
 '''
 import os
 import unittest
+import urllib3
 import yaml
 
+# The CVP nodes under test commonly use self-signed certificates
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
 
 def get_fixtures_path():
     ''' Return the path to the fixtures directory.
@@ -1,24 +1,22 @@
 ''' Base class for TestCvpClient and TestCvpClientCC class.
 '''
-from pprint import pprint
+import itertools
+import logging
 import os
 import sys
 import re
 import time
-import uuid
-import urllib3
 from cvprac.cvp_client import CvpClient
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../lib'))
 from systestlib import DutSystemTest
 
+log = logging.getLogger(__name__)
 
-
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-#
-# sys.path.append(os.path.join(os.path.dirname(__file__), '../lib'))
-# from systestlib import DutSystemTest
+# Change control IDs are '<prefix>-<n>'. The prefix is fixed for the test
+# run so leftover change controls are easy to find and delete on CVP.
+CC_ID_PREFIX = f'cvprac-systest-{int(time.time())}-{os.getpid()}'
+CC_ID_COUNTER = itertools.count()
 
 
 class TestCvpClientBase(DutSystemTest):
@@ -94,7 +92,7 @@ class TestCvpClientBase(DutSystemTest):
     def cancel_task(self, task_id):
         """ Cancel task
         """
-        pprint('CANCELING TASK...')
+        log.debug('CANCELING TASK...')
         data = {'data': [task_id]}
         self.clnt.post('/task/cancelTask.do', data=data)
 
@@ -103,8 +101,7 @@ class TestCvpClientBase(DutSystemTest):
             Set the task_id, cc_id and cc_name. It executes before each test case
         '''
         self.task_id = None
-        self.cc_id = str(uuid.uuid4())
-        # self.cc_name = 'test_api_%d %s' % time.time()
+        self.cc_id = f'{CC_ID_PREFIX}-{next(CC_ID_COUNTER)}'
         self.cc_name = f'test_api_{time.time()}'
 
     def tearDown(self):
@@ -1,14 +1,12 @@
 '''
     Tests for change control apis
 '''
-from pprint import pprint
+import logging
 import time
 import unittest
+from contextlib import contextmanager
 from test_cvp_base import TestCvpClientBase
-import urllib3
 from cvprac.cvp_client_errors import CvpRequestError
-urllib3.disable_warnings(
-    urllib3.exceptions.InsecureRequestWarning)
 
 
 CHANGE_CONTROL_ID_INVALID = 'InvalidCVPRACSystestCCID'
@@ -17,7 +15,8 @@ INVALID_CCID = 'InvalidCVPRACSystestCCID'
 APPROVE_NOTE = "Approving CC via cvprac cc system tests"
 START_NOTE = "Start the CC via cvprac cc system tests"
 STOP_NOTE = "Stop the CC via cvprac cc system tests"
-TASK_ID = None
+
+log = logging.getLogger(__name__)
 
 
 class TestCvpClientCC(TestCvpClientBase):
@@ -28,6 +27,9 @@ class TestCvpClientCC(TestCvpClientBase):
         """ Initialize variables
         """
         super(TestCvpClientCC, cls).setUpClass()
+        if cls.clnt.apiversion is None:
+            cls.api.get_cvp_info()
+        cls.cc_resource_api = cls.clnt.apiversion >= 6.0
 
     @classmethod
     def tearDownClass(cls):
@@ -36,16 +38,14 @@ class TestCvpClientCC(TestCvpClientBase):
         super(TestCvpClientCC,
               cls).tearDownClass()
 
-    def get_version(self):
-        """ Get api version
+    def setUp(self):
+        """ Skip the test if the CVP node does not support the V6
+            (2021.2.0+) change control resource APIs
         """
-        if self.clnt.apiversion is None:
-            self.api.get_cvp_info()
-        if self.clnt.apiversion >= 6.0:
-            pprint('RUN TEST FOR V6 (2021.2.0+) CHANGE CONTROL RESOURCE APIs')
-            return True
-        pprint(f'SKIPPING TEST FOR API - {self.clnt.apiversion}')
-        return False
+        if not self.cc_resource_api:
+            self.skipTest(f'Change control resource APIs not supported for'
+                          f' API version {self.clnt.apiversion}')
+        super(TestCvpClientCC, self).setUp()
 
     def get_cc_status(self, cc_id):
         """ Get change control status
@@ -62,9 +62,6 @@ class TestCvpClientCC(TestCvpClientBase):
         inventory = self.api.get_inventory()
         device_list = []
         if len(inventory) >= 1:
-            # for i in range(0, len(inventory)):
-            #     device_list.append(
-            #         inventory[i]['serialNumber'])
             device_list = [inventory[i]['serialNumber'] for i in range(len(inventory))]
         else:
             raise Exception("No device found")
@@ -73,7 +70,7 @@ class TestCvpClientCC(TestCvpClientBase):
     def create_snapshot(self):
         """ Create snapshot for change control with custom stages
         """
-        pprint('CREATING SNAPSHOT...')
+        log.debug('CREATING SNAPSHOT...')
         device_list = self.get_device_list()
         template_details = {
             "commands": [
@@ -97,7 +94,7 @@ class TestCvpClientCC(TestCvpClientBase):
     def delete_snapshot(self, snaps):
         """ Delete snapshot
         """
-        pprint('DELETING SNAPSHOT...')
+        log.debug('DELETING SNAPSHOT...')
         response = self.clnt.delete(
             '/snapshot/templates?', data=snaps)
         return response
@@ -105,16 +102,14 @@ class TestCvpClientCC(TestCvpClientBase):
     def create_task(self):
         """ Create new task
         """
-        pprint('CREATING TASKS...')
-        # global task_id
+        log.debug('CREATING TASKS...')
         (task_id, _) = self._create_task()
-        self.task_id = task_id
         return task_id
 
     def create_change_control_for_task(self, task_id):
         """ Create change control for tasks
         """
-        pprint('CREATING CHANGE CONTROL...')
+        log.debug('CREATING CHANGE CONTROL...')
         chg_ctrl = self.api.change_control_create_for_tasks(
             self.cc_id, self.cc_name, [task_id])
         assert chg_ctrl is not None
@@ -125,7 +120,7 @@ class TestCvpClientCC(TestCvpClientBase):
     def approve_change_control(self):
         """ Approve change control
         """
-        pprint('APPROVING CHANGE CONTROL...')
+        log.debug('APPROVING CHANGE CONTROL...')
         # Approve the change control
         approve_chg_ctrl = self.api.change_control_approve(
             self.cc_id, notes=APPROVE_NOTE)
@@ -138,7 +133,7 @@ class TestCvpClientCC(TestCvpClientBase):
     def start_change_control(self, cc_id):
         """ Start change control
         """
-        pprint('STARTING CHANGE CONTROL...')
+        log.debug('STARTING CHANGE CONTROL...')
         # Start the change control
         start_chg_ctrl = self.api.change_control_start(
             cc_id, notes=START_NOTE)
@@ -151,7 +146,7 @@ class TestCvpClientCC(TestCvpClientBase):
     def stop_change_control(self):
         """ Stop change control
         """
-        pprint('STOPPING CHANGE CONTROL...')
+        log.debug('STOPPING CHANGE CONTROL...')
         # Stop the change control
         stop_chg_ctrl = self.api.change_control_stop(
             self.cc_id, notes=STOP_NOTE)
@@ -164,7 +159,7 @@ class TestCvpClientCC(TestCvpClientBase):
     def delete_change_control(self, cc_id):
         """ Delete change control
         """
-        pprint('DELETING CHANGE CONTROL...')
+        log.debug('DELETING CHANGE CONTROL...')
         delete_chg_ctrl = self.api.change_control_delete(
             cc_id)
         assert delete_chg_ctrl is not None
@@ -181,21 +176,34 @@ class TestCvpClientCC(TestCvpClientBase):
     def cancel_task(self, task_id):
         """ Cancel task
         """
-        pprint('CANCELING TASK...')
+        log.debug('CANCELING TASK...')
         data = {'data': [task_id]}
         self.clnt.post(
             '/task/cancelTask.do', data=data)
 
-    def test_api_change_control_create_for_task(self):
-        """ Verify change_control_create_for_tasks
+    @contextmanager
+    def stage(self, name):
+        """ Run one stage of the change control lifecycle as a subTest.
+            Each stage needs the previous ones to have succeeded, so the
+            remaining stages are skipped once a stage failed.
+        """
+        passed = False
+        with self.subTest(stage=name):
+            yield
+            passed = True
+        if not passed:
+            self.skipTest('change control %s stage failed' % name)
+
+    def test_api_change_control_lifecycle(self):
+        """ Verify create, approve, start, stop and delete of a change control
+            for a task
         """
-        pprint(
-            "test_api_change_control_create_for_tasks")
-        if self.get_version():
-            # Create Task
-            task_id = self.create_task()
+        log.debug(
+            "test_api_change_control_lifecycle")
+        # Create Task
+        task_id = self.create_task()
 
-            # Create change control;
+        with self.stage('create'):
             chg_ctrl = self.create_change_control_for_task(
                 task_id)
             time.sleep(1)
@@ -209,9 +217,10 @@ class TestCvpClientCC(TestCvpClientBase):
             assert chg_ctrl['value']['change']['name'] == response['value']['change']['name']
             time.sleep(2)
 
+        with self.stage('approve'):
             approve_chg_ctrl = self.approve_change_control()
 
-            # Start change control
+        with self.stage('start'):
             start_chg_ctrl = self.start_change_control(
                 self.cc_id)
 
@@ -237,7 +246,7 @@ class TestCvpClientCC(TestCvpClientBase):
             assert start_chg_ctrl['value']['start']['value'] == response['value']['start']['value']
             assert start_chg_ctrl['value']['start']['notes'] == response['value']['start']['notes']
 
-            # Stop change control
+        with self.stage('stop'):
             stop_chg_ctrl = self.stop_change_control()
 
             # Verify stop CC
@@ -249,8 +258,7 @@ class TestCvpClientCC(TestCvpClientBase):
             assert stop_chg_ctrl['value']['start']['value'] == response['value']['start']['value']
             assert stop_chg_ctrl['value']['start']['notes'] == response['value']['start']['notes']
 
-            # Delete change control
-            pprint('DELETING CHANGE CONTROL...')
+        with self.stage('delete'):
             self.delete_change_control(self.cc_id)
 
             # Verify Delete CC
@@ -260,367 +268,345 @@ class TestCvpClientCC(TestCvpClientBase):
     def test_api_change_control_approval_get_one(self):
         """ Verify change_control_approval_get_one
          """
-        pprint(
+        log.debug(
             "test_api_change_control_approval_get_one")
-        if self.get_version():
-            # Create task
-            task_id = self.create_task()
+        # Create task
+        task_id = self.create_task()
+
+        # Create change control
+        self.create_change_control_for_task(
+            task_id)
+
+        # Approve change control
+        self.approve_change_control()
+
+        log.debug('APPROVAL GET ONE...')
+        approval_get_one = self.api.change_control_approval_get_one(
+            self.cc_id)
+        assert approval_get_one is not None
+        assert approval_get_one['value']['approve']['value'] is True
+        assert approval_get_one['value']['approve']['notes'] == APPROVE_NOTE
+        assert approval_get_one['value']['key']['id'] == self.cc_id
+        time.sleep(1)
 
-            # Create change control
-            self.create_change_control_for_task(
-                task_id)
+        # verify with actual api output
 
-            # Approve change control
-            self.approve_change_control()
+        response = self.get_cc_status(
+            self.cc_id)
 
-            pprint('APPROVAL GET ONE...')
-            approval_get_one = self.api.change_control_approval_get_one(
-                self.cc_id)
-            assert approval_get_one is not None
-            assert approval_get_one['value']['approve']['value'] is True
-            assert approval_get_one['value']['approve']['notes'] == APPROVE_NOTE
-            assert approval_get_one['value']['key']['id'] == self.cc_id
-            time.sleep(1)
+        assert response is not None
+        assert approval_get_one['value']['key']['id'] == response['value']['key']['id']
+        assert approval_get_one['value']['approve'][
+            'notes'] == response['value']['approve']['notes']
+        assert approval_get_one['value']['approve'][
+            'value'] == response['value']['approve']['value']
 
-            # verify with actual api output
+        # Delete change control
+        self.delete_change_control(self.cc_id)
 
-            response = self.get_cc_status(
-                self.cc_id)
-
-            assert response is not None
-            assert approval_get_one['value']['key']['id'] == response['value']['key']['id']
-            assert approval_get_one['value']['approve'][
-                'notes'] == response['value']['approve']['notes']
-            assert approval_get_one['value']['approve'][
-                'value'] == response['value']['approve']['value']
-
-            # Delete change control
-            self.delete_change_control(self.cc_id)
-
-            # Cancel Task
-            self.cancel_task(task_id)
+        # Cancel Task
+        self.cancel_task(task_id)
 
     def test_api_change_control_approval_get_one_without_approve(self):
         """ Verify change_control_approval_get_one_without_approve
          """
-        pprint(
+        log.debug(
             "test_api_change_control_approval_get_one_without_approve")
-        if self.get_version():
-            # Create task
-            task_id = self.create_task()
+        # Create task
+        task_id = self.create_task()
 
-            # Create CC
-            self.create_change_control_for_task(
-                task_id)
+        # Create CC
+        self.create_change_control_for_task(
+            task_id)
 
-            pprint(
-                'APPROVAL GET ONE WITHOUT APPROVE...')
-            approval_get_one = self.api.change_control_approval_get_one(
-                self.cc_id)
-            assert approval_get_one is None
+        log.debug(
+            'APPROVAL GET ONE WITHOUT APPROVE...')
+        approval_get_one = self.api.change_control_approval_get_one(
+            self.cc_id)
+        assert approval_get_one is None
 
-            # Delete CC
-            self.delete_change_control(self.cc_id)
+        # Delete CC
+        self.delete_change_control(self.cc_id)
 
-            # Cancel Task
-            self.cancel_task(task_id)
+        # Cancel Task
+        self.cancel_task(task_id)
 
     def test_api_change_control_create_for_empty_tasks_list(self):
         """ Verify change_control_create_for_tasks for empty task list
         """
-        pprint(
+        log.debug(
             "test_api_change_control_create_for_empty_tasks_list")
-        if self.get_version():
-            # Set client apiversion if it is not already set
-            pprint(
-                'RUN TEST FOR V3 CHANGE CONTROL APIs')
-            with self.assertRaises(CvpRequestError):
-                self.create_change_control_for_task(
-                    [])
+        log.debug(
+            'RUN TEST FOR V3 CHANGE CONTROL APIs')
+        with self.assertRaises(CvpRequestError):
+            self.create_change_control_for_task(
+                [])
 
     def test_api_change_control_create_for_none_task_id_in_list(self):
         """ Verify change_control_create_for_tasks for none task id in list
         """
-        # Set client apiversion if it is not already set
-        pprint(
+        log.debug(
             "test_api_change_control_create_for_none_task_id_in_list")
-        if self.get_version():
-            pprint(
-                'CREATE CHANGE CONTROL FOR LIST OF NONE TASK IDs...')
-            with self.assertRaises(CvpRequestError):
-                self.create_change_control_for_task([
-                                                     None])
+        log.debug(
+            'CREATE CHANGE CONTROL FOR LIST OF NONE TASK IDs...')
+        with self.assertRaises(CvpRequestError):
+            self.create_change_control_for_task([
+                                                 None])
 
     def test_api_change_control_create_for_none_task_ids_not_list(self):
         """ Verify change_control_create_for_tasks for none task ids list
         """
-        # Set client apiversion if it is not already set
-        pprint(
+        log.debug(
             "test_api_change_control_create_for_none_task_ids_not_list")
-        if self.get_version():
-            pprint(
-                'CREATE CHANGE CONTROL FOR NONE TASK IDs...')
-            with self.assertRaises(CvpRequestError):
-                self.create_change_control_for_task(
-                    None)
+        log.debug(
+            'CREATE CHANGE CONTROL FOR NONE TASK IDs...')
+        with self.assertRaises(CvpRequestError):
+            self.create_change_control_for_task(
+                None)
 
     def test_api_change_control_create_for_invalid_task_id(self):
         """ Verify change_control_create_for_tasks for invalid task id
         """
-        pprint(
+        log.debug(
             "test_api_change_control_create_for_invalid_task_id")
-        # Set client apiversion if it is not already set
-        if self.get_version():
-            pprint(
-                'CREATING CHANGE CONTROL FOR INVALID TASK IDs...')
+        log.debug(
+            'CREATING CHANGE CONTROL FOR INVALID TASK IDs...')
 
-            # Create change control for random task
-            chg_ctrl = self.create_change_control_for_task(
-                INVALID_TASK_ID)
+        # Create change control for random task
+        chg_ctrl = self.create_change_control_for_task(
+            INVALID_TASK_ID)
 
-            # Approve the change control
-            self.approve_change_control()
+        # Approve the change control
+        self.approve_change_control()
 
-            # Verify CC
-            response = self.get_cc_status(
-                self.cc_id)
+        # Verify CC
+        response = self.get_cc_status(
+            self.cc_id)
 
-            assert response is not None
-            assert chg_ctrl['value']['key']['id'] == response['value']['key']['id']
-            assert chg_ctrl['value']['change']['name'] == response['value']['change']['name']
+        assert response is not None
+        assert chg_ctrl['value']['key']['id'] == response['value']['key']['id']
+        assert chg_ctrl['value']['change']['name'] == response['value']['change']['name']
 
-            # Delete CC
-            self.delete_change_control(self.cc_id)
+        # Delete CC
+        self.delete_change_control(self.cc_id)
 
     def test_api_change_control_approve_invalid_tasks(self):
         """ Verify test_api_change_control_approve_invalid_tasks
                 """
-        pprint(
+        log.debug(
             "test_api_change_control_approve_invalid_tasks")
-        if self.get_version():
-            pprint(
-                'APPROVING CHANGE CONTROL FOR INVALID TASKS...')
-            # Approve the change control
-            approve_chg_ctrl = self.api.change_control_approve(
-                CHANGE_CONTROL_ID_INVALID, notes=APPROVE_NOTE)
-            assert approve_chg_ctrl is None
+        log.debug(
+            'APPROVING CHANGE CONTROL FOR INVALID TASKS...')
+        # Approve the change control
+        approve_chg_ctrl = self.api.change_control_approve(
+            CHANGE_CONTROL_ID_INVALID, notes=APPROVE_NOTE)
+        assert approve_chg_ctrl is None
 
     def test_api_change_control_start_invalid_tasks(self):
         """ Verify test_api_change_control_start_invalid_tasks
         """
-        pprint("test_api_change_control_start_invalid_tasks")
-        if self.get_version():
-            pprint('STARTING CHANGE CONTROL FOR INVALID TASKS...')
-            # Start the change control
-            dut = self.duts[0]
-            node = dut['node'] + ":443"
-            # CVP 2022.1.0 format The forward slashes in the error string are likely a bug
-            pprint('SETTING DEFAULT ERROR MESSAGE FORMAT FOR CVP 2022.1.0')
-            err_msg = 'POST: https://' + node + '/api/resources/changecontrol/v1/' \
-                                                'ChangeControlConfig : Request Error:' \
-                                                ' Not Found - {"code":5, "message":"change' \
-                                                ' control with ID' \
-                                                ' \\\\"InvalidCVPRACSystestCCID\\\\"' \
-                                                ' does not exist"}'
-            if self.clnt.apiversion < 8.0:
-                # CVP 2021.X.X format
-                pprint('USING ERROR MESSAGE FORMAT FOR CVP 2021.X.X')
-                err_msg = "POST: https://" + node + "/api/resources/changecontrol/v1/" \
-                                                    "ChangeControlConfig : Request Error: " \
-                                                    "Bad Request -" \
-                                                    " {\"code\":9,[ ]?\"message\":\"not approved\"}"
-            with self.assertRaisesRegex(CvpRequestError, err_msg):
-                self.start_change_control(CHANGE_CONTROL_ID_INVALID)
+        log.debug("test_api_change_control_start_invalid_tasks")
+        log.debug('STARTING CHANGE CONTROL FOR INVALID TASKS...')
+        # Start the change control
+        dut = self.duts[0]
+        node = dut['node'] + ":443"
+        # CVP 2022.1.0 format The forward slashes in the error string are likely a bug
+        log.debug('SETTING DEFAULT ERROR MESSAGE FORMAT FOR CVP 2022.1.0')
+        err_msg = 'POST: https://' + node + '/api/resources/changecontrol/v1/' \
+                                            'ChangeControlConfig : Request Error:' \
+                                            ' Not Found - {"code":5, "message":"change' \
+                                            ' control with ID' \
+                                            ' \\\\"InvalidCVPRACSystestCCID\\\\"' \
+                                            ' does not exist"}'
+        if self.clnt.apiversion < 8.0:
+            # CVP 2021.X.X format
+            log.debug('USING ERROR MESSAGE FORMAT FOR CVP 2021.X.X')
+            err_msg = "POST: https://" + node + "/api/resources/changecontrol/v1/" \
+                                                "ChangeControlConfig : Request Error: " \
+                                                "Bad Request -" \
+                                                " {\"code\":9,[ ]?\"message\":\"not approved\"}"
+        with self.assertRaisesRegex(CvpRequestError, err_msg):
+            self.start_change_control(CHANGE_CONTROL_ID_INVALID)
 
     def test_api_change_control_delete_invalid_cc(self):
         """ Verify test_api_change_control_delete_invalid_cc
                  """
-        pprint(
+        log.debug(
             "test_api_change_control_delete_invalid_cc")
-        if self.get_version():
-            pprint('DELETING CHANGE CONTROL...')
-            with self.assertRaises(CvpRequestError):
-                self.delete_change_control(
-                    CHANGE_CONTROL_ID_INVALID)
+        log.debug('DELETING CHANGE CONTROL...')
+        with self.assertRaises(CvpRequestError):
+            self.delete_change_control(
+                CHANGE_CONTROL_ID_INVALID)
 
     def test_api_change_control_get_one(self):
         """ Verify change_control_get_one
          """
-        pprint("test_api_change_control_get_one")
-        if self.get_version():
-            # Create task
-            task_id = self.create_task()
-
-            # Create CC
-            self.create_change_control_for_task(
-                task_id)
-
-            pprint("CHANGE CONTROL GET ONE...")
-            # chg_ctrl_get_one = self.api.change_control_get_one(self.cc_id)
-            chg_ctrl_get_one = self.change_control_get_one(
-                self.cc_id)
-            assert chg_ctrl_get_one is not None
-            assert chg_ctrl_get_one['value']['key']['id'] == self.cc_id
-            assert chg_ctrl_get_one['value']['change']['name'] == self.cc_name
-            assert chg_ctrl_get_one['value']['change']['stages']['values']['stage0'] \
-                ['action']['args']['values']['TaskID'] == task_id
-            # verify with actual api output
-            response = self.get_cc_status(
-                self.cc_id)
-            assert chg_ctrl_get_one['value']['key']['id'] == response['value']['key']['id']
-            assert chg_ctrl_get_one['value']['change']['name'] == response['value']['change'][
-                'name']
-            assert chg_ctrl_get_one['value']['change']['stages']['values']['stage0']['action'] \
-                ['args']['values']['TaskID'] == response['value']['change']['stages']['values'] \
-                ['stage0']['action']['args']['values']['TaskID']
-
-            # Delete CC
-            self.delete_change_control(self.cc_id)
-
-            # Cancel Task
-            self.cancel_task(task_id)
+        log.debug("test_api_change_control_get_one")
+        # Create task
+        task_id = self.create_task()
+
+        # Create CC
+        self.create_change_control_for_task(
+            task_id)
+
+        log.debug("CHANGE CONTROL GET ONE...")
+        chg_ctrl_get_one = self.change_control_get_one(
+            self.cc_id)
+        assert chg_ctrl_get_one is not None
+        assert chg_ctrl_get_one['value']['key']['id'] == self.cc_id
+        assert chg_ctrl_get_one['value']['change']['name'] == self.cc_name
+        assert chg_ctrl_get_one['value']['change']['stages']['values']['stage0'] \
+            ['action']['args']['values']['TaskID'] == task_id
+        # verify with actual api output
+        response = self.get_cc_status(
+            self.cc_id)
+        assert chg_ctrl_get_one['value']['key']['id'] == response['value']['key']['id']
+        assert chg_ctrl_get_one['value']['change']['name'] == response['value']['change'][
+            'name']
+        assert chg_ctrl_get_one['value']['change']['stages']['values']['stage0']['action'] \
+            ['args']['values']['TaskID'] == response['value']['change']['stages']['values'] \
+            ['stage0']['action']['args']['values']['TaskID']
+
+        # Delete CC
+        self.delete_change_control(self.cc_id)
+
+        # Cancel Task
+        self.cancel_task(task_id)
 
     def test_api_change_control_get_one_without_ccid(self):
         """ Verify change_control_get_one_without_ccid
          """
-        pprint(
+        log.debug(
             "test_api_change_control_get_one_without_ccid")
-        if self.get_version():
-            pprint(
-                "CHANGE CONTROL GET ONE WITHOUT CC_ID...")
-            err_msg = "change_control_get_one() missing 1 required positional argument: 'cc_id'"
-            with self.assertRaises(TypeError) as ex:
-                self.change_control_get_one()
-                self.assertEqual(
-                    err_msg, ex.exception)
+        log.debug(
+            "CHANGE CONTROL GET ONE WITHOUT CC_ID...")
+        err_msg = "change_control_get_one() missing 1 required positional argument: 'cc_id'"
+        with self.assertRaises(TypeError) as ex:
+            self.change_control_get_one()
+            self.assertEqual(
+                err_msg, ex.exception)
 
     def test_api_change_control_get_one_with_none_ccid(self):
         """ Verify change_control_get_one_with_none_ccid
          """
-        pprint(
+        log.debug(
             "test_api_change_control_get_one_with_none_ccid")
-        if self.get_version():
-            pprint(
-                "CHANGE CONTROL GET WITH NONE CC_ID...")
-            chg_ctrl_get_one = self.change_control_get_one(
-                None)
-            assert chg_ctrl_get_one is None
+        log.debug(
+            "CHANGE CONTROL GET WITH NONE CC_ID...")
+        chg_ctrl_get_one = self.change_control_get_one(
+            None)
+        assert chg_ctrl_get_one is None
 
     def test_api_change_control_get_one_with_invalid_ccid(self):
         """ Verify change_control_get_one_with_invalid_ccid
          """
-        pprint(
+        log.debug(
             "test_api_change_control_get_one_with_invalid_ccid")
-        if self.get_version():
-            pprint(
-                "CHANGE CONTROL GET WITH INVALID CC_ID...")
-            chg_ctrl_get_one = self.change_control_get_one(
-                INVALID_CCID)
-            assert chg_ctrl_get_one is None
+        log.debug(
+            "CHANGE CONTROL GET WITH INVALID CC_ID...")
+        chg_ctrl_get_one = self.change_control_get_one(
+            INVALID_CCID)
+        assert chg_ctrl_get_one is None
 
     def test_api_change_control_get_all(self):
         """ Verify change_control_get_all
          """
-        pprint("test_api_change_control_get_all")
+        log.debug("test_api_change_control_get_all")
         ids = []
-        if self.get_version():
-            pprint("CHANGE CONTROL GET ALL...")
-            # Create task
-            task_id = self.create_task()
+        log.debug("CHANGE CONTROL GET ALL...")
+        # Create task
+        task_id = self.create_task()
 
-            # Create CC
-            self.create_change_control_for_task(
-                task_id)
+        # Create CC
+        self.create_change_control_for_task(
+            task_id)
 
-            chg_ctrl_get_all = self.api.change_control_get_all()
-            for i in range(len(chg_ctrl_get_all['data'])):
-                ids.append(chg_ctrl_get_all['data'][i]
-                           ['result']['value']['key']['id'])
-            assert self.cc_id in ids
+        chg_ctrl_get_all = self.api.change_control_get_all()
+        for i in range(len(chg_ctrl_get_all['data'])):
+            ids.append(chg_ctrl_get_all['data'][i]
+                       ['result']['value']['key']['id'])
+        assert self.cc_id in ids
 
-            # Delete CC
-            self.delete_change_control(self.cc_id)
+        # Delete CC
+        self.delete_change_control(self.cc_id)
 
-            # Cancel Task
-            self.cancel_task(task_id)
+        # Cancel Task
+        self.cancel_task(task_id)
 
     def test_api_change_control_get_all_without_create_chg_ctrl(self):
         """ Verify change_control_get_all_without_create_chg_ctrl
          """
-        pprint("test_api_change_control_get_all_without_create_chg_ctrl")
+        log.debug("test_api_change_control_get_all_without_create_chg_ctrl")
         ids = []
-        if self.get_version():
-            pprint("CHANGE CONTROL GET ALL WITHOUT CHANGE CONTROL CREATION...")
-            resp = self.api.change_control_get_all()
-            if 'data' in resp:
-                for i in range(len(resp['data'])):
-                    ids.append(resp['data'][i]['result']['value']['key']['id'])
-            assert self.cc_id not in ids
+        log.debug("CHANGE CONTROL GET ALL WITHOUT CHANGE CONTROL CREATION...")
+        resp = self.api.change_control_get_all()
+        if 'data' in resp:
+            for i in range(len(resp['data'])):
+                ids.append(resp['data'][i]['result']['value']['key']['id'])
+        assert self.cc_id not in ids
 
     def test_api_change_control_approval_get_all(self):
         """ Verify change_control_approval_get_all
          """
-        pprint("test_api_change_control_approval_get_all")
+        log.debug("test_api_change_control_approval_get_all")
         ids = []
-        if self.get_version():
-            # Create task
-            task_id = self.create_task()
-
-            # Create CC
-            self.create_change_control_for_task(
-                task_id)
-
-            # Approve CC
-            self.approve_change_control()
-
-            pprint(
-                "CHANGE CONTROL APPROVAL GET ALL...")
-            chg_ctrl_approval_get_all = self.api.change_control_approval_get_all()
-            for i in range(len(chg_ctrl_approval_get_all['data'])):
-                ids.append(
-                    chg_ctrl_approval_get_all['data'][i]['result']['value']['key']['id'])
-                if chg_ctrl_approval_get_all['data'][i]['result']['value']['key']['id'] \
-                        == self.cc_id:
-                    check_index = i
-            assert self.cc_id in ids
-            assert chg_ctrl_approval_get_all['data'][check_index][
-                'result']['value']['approve']['value'] is True
-
-            # Delete CC
-            self.delete_change_control(self.cc_id)
-
-            # Cancel Task
-            self.cancel_task(task_id)
+        # Create task
+        task_id = self.create_task()
+
+        # Create CC
+        self.create_change_control_for_task(
+            task_id)
+
+        # Approve CC
+        self.approve_change_control()
+
+        log.debug(
+            "CHANGE CONTROL APPROVAL GET ALL...")
+        chg_ctrl_approval_get_all = self.api.change_control_approval_get_all()
+        for i in range(len(chg_ctrl_approval_get_all['data'])):
+            ids.append(
+                chg_ctrl_approval_get_all['data'][i]['result']['value']['key']['id'])
+            if chg_ctrl_approval_get_all['data'][i]['result']['value']['key']['id'] \
+                    == self.cc_id:
+                check_index = i
+        assert self.cc_id in ids
+        assert chg_ctrl_approval_get_all['data'][check_index][
+            'result']['value']['approve']['value'] is True
+
+        # Delete CC
+        self.delete_change_control(self.cc_id)
+
+        # Cancel Task
+        self.cancel_task(task_id)
 
     def test_api_change_control_approval_get_all_without_approve(self):
         """ Verify change_control_approval_get_all_without_approve
          """
-        pprint("test_api_change_control_approval_get_all_without_approve")
-        if self.get_version():
-            # Create task
-            task_id = self.create_task()
+        log.debug("test_api_change_control_approval_get_all_without_approve")
+        # Create task
+        task_id = self.create_task()
 
-            # Create CC
-            self.create_change_control_for_task(
-                task_id)
+        # Create CC
+        self.create_change_control_for_task(
+            task_id)
 
-            ids = []
-            pprint("CHANGE CONTROL APPROVAL GET ALL WITHOUT APPROVE...")
-            resp = self.api.change_control_approval_get_all()
-            if 'data' in resp:
-                for i in range(len(resp['data'])):
-                    ids.append(resp['data'][i]['result']['value']['key']['id'])
-            assert self.cc_id not in ids
-
-            # Delete CC
-            self.delete_change_control(self.cc_id)
-            # Cancel Task
-            self.cancel_task(task_id)
+        ids = []
+        log.debug("CHANGE CONTROL APPROVAL GET ALL WITHOUT APPROVE...")
+        resp = self.api.change_control_approval_get_all()
+        if 'data' in resp:
+            for i in range(len(resp['data'])):
+                ids.append(resp['data'][i]['result']['value']['key']['id'])
+        assert self.cc_id not in ids
+
+        # Delete CC
+        self.delete_change_control(self.cc_id)
+        # Cancel Task
+        self.cancel_task(task_id)
 
     def test_api_change_control_create_with_custom_stages(self):
         """ Verify test_api_change_control_create_with_custom_stages
         """
-        pprint(
+        log.debug(
             "test_api_change_control_create_with_custom_stages")
         devices = self.get_device_list()
         if len(devices) > 1:
@@ -683,104 +669,101 @@ class TestCvpClientCC(TestCvpClientBase):
                                         'name': 'stage 3'},
                                   }}}}
 
-        if self.get_version():
-            pprint(
-                "CHANGE CONTROL CREATE WITH CUSTOM STAGES...")
-            chg_ctrl_create_with_custom_stages = self.api.change_control_create_with_custom_stages(
-                custom_cc)
-            assert chg_ctrl_create_with_custom_stages[
-                'value']['key']['id'] == self.cc_id
-            assert chg_ctrl_create_with_custom_stages[
-                'value']['change']['name'] == self.cc_name
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
-                'values']['1a']['action']['args']['values']['DeviceID'] == device_id_1
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
-                'values']['1a']['action']['args']['values']['TemplateID'] == template_id[0]
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
-                'values']['1b']['action']['args']['values']['DeviceID'] == device_id_1
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
-                'values']['1b']['action']['args']['values']['TemplateID'] == template_id[0]
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
-                'values']['2a']['action']['args']['values']['DeviceID'] == device_id_1
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
-                'values']['2a']['action']['args']['values']['TemplateID'] == template_id[0]
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
-                'values']['2b']['action']['args']['values']['DeviceID'] == device_id_2
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
-                'values']['2b']['action']['args']['values']['TemplateID'] == template_id[1]
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
-                'values']['3']['action']['args']['values']['DeviceID'] == device_id_2
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
-                'values']['3']['action']['args']['values']['TemplateID'] == template_id[1]
-
-            response = self.get_cc_status(
-                self.cc_id)
-
-            assert chg_ctrl_create_with_custom_stages['value'][
-                'key']['id'] == response['value']['key']['id']
-            assert chg_ctrl_create_with_custom_stages['value'][
-                'change']['name'] == response['value']['change']['name']
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
-                '1a']['action']['args']['values']['DeviceID'] == response['value']['change'][
-                'stages']['values']['1a']['action']['args']['values']['DeviceID']
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
-                '1a']['action']['args']['values']['TemplateID'] == response['value']['change'][
-                'stages']['values']['1a']['action']['args']['values']['TemplateID']
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
-                '1b']['action']['args']['values']['DeviceID'] == response['value']['change'][
-                'stages']['values']['1b']['action']['args']['values']['DeviceID']
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
-                '1b']['action']['args']['values']['TemplateID'] == response['value']['change'][
-                'stages']['values']['1b']['action']['args']['values']['TemplateID']
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
-                '2a']['action']['args']['values']['DeviceID'] == response['value']['change'][
-                'stages']['values']['2a']['action']['args']['values']['DeviceID']
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
-                '2a']['action']['args']['values']['TemplateID'] == response['value']['change'][
-                'stages']['values']['2a']['action']['args']['values']['TemplateID']
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
-                '2b']['action']['args']['values']['DeviceID'] == response['value']['change'][
-                'stages']['values']['2b']['action']['args']['values']['DeviceID']
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
-                '2b']['action']['args']['values']['TemplateID'] == response['value']['change'][
-                'stages']['values']['2b']['action']['args']['values']['TemplateID']
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
-                '3']['action']['args']['values']['DeviceID'] == response['value']['change'][
-                'stages']['values']['3']['action']['args']['values']['DeviceID']
-            assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
-                '3']['action']['args']['values']['TemplateID'] == response['value']['change'][
-                'stages']['values']['3']['action']['args']['values']['TemplateID']
-            self.approve_change_control()
-            self.start_change_control(self.cc_id)
-            time.sleep(1)
-            self.stop_change_control()
-            self.delete_change_control(self.cc_id)
-            delete_snap = self.delete_snapshot(
-                template_id)
-            assert delete_snap['result'] == 'Success'
+        log.debug(
+            "CHANGE CONTROL CREATE WITH CUSTOM STAGES...")
+        chg_ctrl_create_with_custom_stages = self.api.change_control_create_with_custom_stages(
+            custom_cc)
+        assert chg_ctrl_create_with_custom_stages[
+            'value']['key']['id'] == self.cc_id
+        assert chg_ctrl_create_with_custom_stages[
+            'value']['change']['name'] == self.cc_name
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
+            'values']['1a']['action']['args']['values']['DeviceID'] == device_id_1
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
+            'values']['1a']['action']['args']['values']['TemplateID'] == template_id[0]
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
+            'values']['1b']['action']['args']['values']['DeviceID'] == device_id_1
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
+            'values']['1b']['action']['args']['values']['TemplateID'] == template_id[0]
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
+            'values']['2a']['action']['args']['values']['DeviceID'] == device_id_1
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
+            'values']['2a']['action']['args']['values']['TemplateID'] == template_id[0]
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
+            'values']['2b']['action']['args']['values']['DeviceID'] == device_id_2
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
+            'values']['2b']['action']['args']['values']['TemplateID'] == template_id[1]
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
+            'values']['3']['action']['args']['values']['DeviceID'] == device_id_2
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages'][
+            'values']['3']['action']['args']['values']['TemplateID'] == template_id[1]
+
+        response = self.get_cc_status(
+            self.cc_id)
+
+        assert chg_ctrl_create_with_custom_stages['value'][
+            'key']['id'] == response['value']['key']['id']
+        assert chg_ctrl_create_with_custom_stages['value'][
+            'change']['name'] == response['value']['change']['name']
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
+            '1a']['action']['args']['values']['DeviceID'] == response['value']['change'][
+            'stages']['values']['1a']['action']['args']['values']['DeviceID']
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
+            '1a']['action']['args']['values']['TemplateID'] == response['value']['change'][
+            'stages']['values']['1a']['action']['args']['values']['TemplateID']
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
+            '1b']['action']['args']['values']['DeviceID'] == response['value']['change'][
+            'stages']['values']['1b']['action']['args']['values']['DeviceID']
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
+            '1b']['action']['args']['values']['TemplateID'] == response['value']['change'][
+            'stages']['values']['1b']['action']['args']['values']['TemplateID']
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
+            '2a']['action']['args']['values']['DeviceID'] == response['value']['change'][
+            'stages']['values']['2a']['action']['args']['values']['DeviceID']
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
+            '2a']['action']['args']['values']['TemplateID'] == response['value']['change'][
+            'stages']['values']['2a']['action']['args']['values']['TemplateID']
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
+            '2b']['action']['args']['values']['DeviceID'] == response['value']['change'][
+            'stages']['values']['2b']['action']['args']['values']['DeviceID']
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
+            '2b']['action']['args']['values']['TemplateID'] == response['value']['change'][
+            'stages']['values']['2b']['action']['args']['values']['TemplateID']
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
+            '3']['action']['args']['values']['DeviceID'] == response['value']['change'][
+            'stages']['values']['3']['action']['args']['values']['DeviceID']
+        assert chg_ctrl_create_with_custom_stages['value']['change']['stages']['values'][
+            '3']['action']['args']['values']['TemplateID'] == response['value']['change'][
+            'stages']['values']['3']['action']['args']['values']['TemplateID']
+        self.approve_change_control()
+        self.start_change_control(self.cc_id)
+        time.sleep(1)
+        self.stop_change_control()
+        self.delete_change_control(self.cc_id)
+        delete_snap = self.delete_snapshot(
+            template_id)
+        assert delete_snap['result'] == 'Success'
 
     def test_api_change_control_create_with_custom_stages_without_custom_cc(self):
         """ Verify test_api_change_control_create_with_custom_stages
         """
-        pprint(
+        log.debug(
             "test_api_change_control_create_with_custom_stages_without_custom_cc")
-        if self.get_version():
-            pprint(
-                "CHANGE CONTROL CREATE WITH CUSTOM STAGES WITHOUT CUSTOM CC...")
-            with self.assertRaises(CvpRequestError):
-                self.api.change_control_create_with_custom_stages()
+        log.debug(
+            "CHANGE CONTROL CREATE WITH CUSTOM STAGES WITHOUT CUSTOM CC...")
+        with self.assertRaises(CvpRequestError):
+            self.api.change_control_create_with_custom_stages()
 
     def test_api_change_control_create_with_custom_stages_with_none_custom_cc(self):
         """ Verify test_api_change_control_create_with_custom_stages
         """
-        pprint(
+        log.debug(
             "test_api_change_control_create_with_custom_stages_with_none_custom_cc")
-        if self.get_version():
-            pprint(
-                "CHANGE CONTROL CREATE WITH CUSTOM STAGES WITH NONE CUSTOM CC...")
-            with self.assertRaises(CvpRequestError):
-                self.api.change_control_create_with_custom_stages(
-                    None)
+        log.debug(
+            "CHANGE CONTROL CREATE WITH CUSTOM STAGES WITH NONE CUSTOM CC...")
+        with self.assertRaises(CvpRequestError):
+            self.api.change_control_create_with_custom_stages(
+                None)
 
 
 if __name__ == '__main__':
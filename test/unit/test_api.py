@@ -0,0 +1,145 @@
+#
+# Copyright (c) 2017, Arista Networks, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+#   Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+#
+#   Neither the name of Arista Networks nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# 'AS IS' AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL ARISTA NETWORKS
+# BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN
+# IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+''' Unit tests for the CvpApi class
+
+    The change control responses are replayed from
+    test/fixtures/cc_lifecycle.json so the create, approve, start and stop
+    sequence runs without a CVP node or a provisioned task.
+'''
+import json
+import os
+import unittest
+from mock import Mock
+from cvprac.cvp_api import CvpApi
+
+CC_ID = 'cvprac-cc-lifecycle'
+CC_URL = '/api/resources/changecontrol/v1/ChangeControlConfig'
+
+
+def load_responses():
+    ''' Return the recorded change control responses keyed by operation.
+    '''
+    filename = os.path.join(os.path.dirname(__file__),
+                            '../fixtures/cc_lifecycle.json')
+    with open(filename) as fixture:
+        return json.load(fixture)
+
+
+class TestApi(unittest.TestCase):
+    """ Unit test cases for CvpApi
+    """
+    # pylint: disable=invalid-name
+
+    def setUp(self):
+        """ Setup a CvpApi with a mocked CVP 2021.2.0+ client
+        """
+        self.responses = load_responses()
+        self.clnt = Mock()
+        self.clnt.is_cvaas = False
+        self.clnt.apiversion = 6.0
+        self.clnt.cvp_info = None
+        self.clnt.get.return_value = self.responses['get_one']
+        self.api = CvpApi(self.clnt)
+
+    def test_get_cvp_info_cached(self):
+        """ Test get_cvp_info only queries CVP once unless refreshed
+        """
+        self.clnt.apiversion = None
+        self.clnt.get.return_value = {'version': '2021.2.0'}
+        self.assertEqual(self.api.get_cvp_info(), {'version': '2021.2.0'})
+        self.clnt.set_version.assert_called_once_with('2021.2.0')
+        self.assertEqual(self.api.get_cvp_info(), {'version': '2021.2.0'})
+        self.clnt.get.assert_called_once_with('/cvpInfo/getCvpInfo.do',
+                                              timeout=30)
+        self.api.get_cvp_info(refresh=True)
+        self.assertEqual(self.clnt.get.call_count, 2)
+
+    def test_change_control_lifecycle(self):
+        """ Test create, approve, start and stop of a change control
+        """
+        self.clnt.post.side_effect = [self.responses[name] for name in
+                                      ('create', 'approve', 'start', 'stop')]
+
+        resp = self.api.change_control_create_for_tasks(
+            CC_ID, 'cvprac CC lifecycle', ['538'])
+        self.assertEqual(resp, self.responses['create'])
+        data = self.clnt.post.call_args[1]['data']
+        self.assertEqual(data['key']['id'], CC_ID)
+        self.assertEqual(data['change']['stages']['values']['stage0']
+                         ['action']['args']['values']['TaskID'], '538')
+
+        resp = self.api.change_control_approve(CC_ID, notes='approve')
+        self.assertEqual(resp, self.responses['approve'])
+        self.clnt.get.assert_called_once_with(
+            '/api/resources/changecontrol/v1/ChangeControl?key.id=%s' % CC_ID,
+            timeout=30)
+        data = self.clnt.post.call_args[1]['data']
+        self.assertEqual(data['approve'], {'value': True, 'notes': 'approve'})
+        self.assertEqual(data['version'],
+                         self.responses['get_one']['value']['change']['time'])
+
+        resp = self.api.change_control_start(CC_ID, notes='start')
+        self.assertEqual(resp, self.responses['start'])
+        self.clnt.post.assert_called_with(
+            CC_URL, data={'key': {'id': CC_ID},
+                          'start': {'value': True, 'notes': 'start'}},
+            timeout=30)
+
+        resp = self.api.change_control_stop(CC_ID, notes='stop')
+        self.assertEqual(resp, self.responses['stop'])
+        self.clnt.post.assert_called_with(
+            CC_URL, data={'key': {'id': CC_ID},
+                          'start': {'value': False, 'notes': 'stop'}},
+            timeout=30)
+        self.assertEqual(self.clnt.post.call_count, 4)
+
+    def test_change_control_approve_not_found(self):
+        """ Test approve returns None for an unknown change control
+        """
+        self.clnt.get.side_effect = Exception('resource not found')
+        self.assertIsNone(self.api.change_control_approve(CC_ID))
+        self.clnt.post.assert_not_called()
+
+    def test_change_control_old_cvp(self):
+        """ Test the Resource API wrappers do nothing before CVP 2021.2.0
+        """
+        self.clnt.apiversion = 5.0
+        self.assertIsNone(self.api.change_control_create_for_tasks(
+            CC_ID, 'cvprac CC lifecycle', ['538']))
+        self.assertIsNone(self.api.change_control_start(CC_ID))
+        self.assertIsNone(self.api.change_control_stop(CC_ID))
+        self.clnt.post.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -33,13 +33,22 @@
 
 ''' Unit tests for the CvpClient class
 '''
+import io
 import json
+import socket
+import threading
+import time
 import unittest
-from itertools import cycle
-from mock import Mock
+import weakref
+import requests
+from mock import Mock, patch
 from requests.exceptions import HTTPError, ReadTimeout, JSONDecodeError
-from cvprac.cvp_client import CvpClient
-from cvprac.cvp_client_errors import CvpApiError, CvpSessionLogOutError
+from cvprac import cvp_http2
+from cvprac.cvp_client import CvpClient, json_decoder, _keepalive
+from cvprac.cvp_client_errors import CvpApiError, CvpLoginError, \
+    CvpSessionLogOutError
+from cvprac.cvp_http2 import Http2Session
+from cvprac.cvp_json import json_dumps
 
 
 class TestClient(unittest.TestCase):
@@ -56,7 +65,12 @@ class TestClient(unittest.TestCase):
         nodes = ['1.1.1.1']
         self.clnt.nodes = nodes
         self.clnt.node_cnt = len(nodes)
-        self.clnt.node_pool = cycle(nodes)
+        self.clnt._node_idx = 0
+        self.clnt._node_health = [{'fail_streak': 0, 'ewma_latency': 0.0}
+                                  for _ in nodes]
+        self.clnt._current_host = nodes[0]
+        self.clnt._port = 443
+        self.clnt._set_node_urls()
 
     def test_set_version(self):
         """ Test setting of client.apiversion parameter
@@ -168,6 +182,31 @@ class TestClient(unittest.TestCase):
         self.assertEqual(self.clnt.apiversion, 4.0)
         self.clnt.apiversion = None
 
+        test_version = '2020.2.4'
+        self.clnt.set_version(test_version)
+        self.assertEqual(self.clnt.apiversion, 5.0)
+        self.clnt.apiversion = None
+
+        test_version = '2021.2.1'
+        self.clnt.set_version(test_version)
+        self.assertEqual(self.clnt.apiversion, 6.0)
+        self.clnt.apiversion = None
+
+        test_version = '2021.3'
+        self.clnt.set_version(test_version)
+        self.assertEqual(self.clnt.apiversion, 7.0)
+        self.clnt.apiversion = None
+
+        test_version = '2022.1.0'
+        self.clnt.set_version(test_version)
+        self.assertEqual(self.clnt.apiversion, 8.0)
+        self.clnt.apiversion = None
+
+        test_version = '2023.2.1'
+        self.clnt.set_version(test_version)
+        self.assertEqual(self.clnt.apiversion, 8.0)
+        self.clnt.apiversion = None
+
     def test_create_session_default_https(self):
         """ Test connection to CVP nodes will default to https.
         """
@@ -180,7 +219,8 @@ class TestClient(unittest.TestCase):
     def test_create_session_https_port(self):
         """ Test https session with user provided port.
         """
-        self.clnt.port = 7777
+        self.clnt._port = 7777
+        self.clnt._set_node_urls()
         url = 'https://1.1.1.1:7777/web'
         self.clnt._reset_session = Mock()
         self.clnt._reset_session.return_value = None
@@ -190,7 +230,6 @@ class TestClient(unittest.TestCase):
     def test_create_session_no_http_fallback(self):
         """ Test a failed https connection will not attempt to fallback to http.
         """
-        self.clnt.port = None
         url = 'https://1.1.1.1:443/web'
         error = '\n1.1.1.1: Failed to connect via https\n'
         self.clnt._reset_session = Mock()
@@ -200,24 +239,290 @@ class TestClient(unittest.TestCase):
         self.assertEqual(self.clnt.url_prefix, url)
         self.assertEqual(self.clnt.error_msg, error)
 
+    def test_create_session_round_robin_health(self):
+        """ Test sessions rotate round-robin over the nodes and unhealthy
+            nodes are tried last. API token sessions try one node at a time.
+        """
+        nodes = ['1.1.1.1', '2.2.2.2', '3.3.3.3']
+        self.clnt.nodes = nodes
+        self.clnt.node_cnt = len(nodes)
+        self.clnt._node_idx = 2
+        self.clnt._node_health = [{'fail_streak': 0, 'ewma_latency': 0.0}
+                                  for _ in nodes]
+        self.clnt._set_node_urls()
+        self.clnt.api_token = 'token'
+        self.clnt._reset_session = Mock(return_value=None)
+        self.clnt._create_session(all_nodes=True)
+        self.assertEqual(self.clnt.url_prefix, 'https://1.1.1.1:443/web')
+        self.assertEqual(self.clnt._current_host, '1.1.1.1')
+        self.assertEqual(self.clnt._node_order(), [1, 2])
+
+        self.clnt._node_health[1]['fail_streak'] = \
+            self.clnt.NODE_FAIL_THRESHOLD
+        self.assertEqual(self.clnt._node_order(), [2, 1])
+        self.assertEqual(self.clnt._node_order(all_nodes=True), [2, 0, 1])
+
+        # Healthy nodes are ordered by latency
+        self.clnt._node_health[2]['ewma_latency'] = 0.5
+        self.clnt._node_health[0]['ewma_latency'] = 0.1
+        self.assertEqual(self.clnt._node_order(all_nodes=True), [0, 2, 1])
+
+        self.clnt._reset_session.side_effect = ['Failed', None]
+        self.clnt._create_session()
+        self.assertEqual(self.clnt.url_prefix, 'https://2.2.2.2:443/web')
+        self.assertEqual(self.clnt._node_health[2]['fail_streak'], 1)
+        self.assertEqual(self.clnt._node_health[1]['fail_streak'], 0)
+
+    def test_create_session_parallel_login(self):
+        """ Test a failover sends the logins to all of the other nodes at
+            once without holding the session lock, keeps the current session
+            until a node accepted the login, uses the first node in
+            round-robin order that accepted the login and logs out of the
+            other nodes that accepted it.
+        """
+        nodes = ['1.1.1.1', '2.2.2.2', '3.3.3.3', '4.4.4.4']
+        self.clnt.nodes = nodes
+        self.clnt.node_cnt = len(nodes)
+        self.clnt._node_idx = 0
+        self.clnt._node_health = [{'fail_streak': 0, 'ewma_latency': 0.0}
+                                  for _ in nodes]
+        self.clnt._set_node_urls()
+        self.clnt._http_session = Mock()
+        self.clnt._new_login_session = Mock(side_effect=Mock)
+        old_session = Mock()
+        self.clnt.session = old_session
+        self.clnt.headers['APP_SESSION_ID'] = 'old'
+        results = {1: HTTPError('unreachable'),
+                   2: (Mock(cookies='cookies2'), {'sessionId': 'id2'}),
+                   3: (Mock(cookies='cookies3'), {'sessionId': 'id3'}),
+                   0: HTTPError('down')}
+        sessions = {}
+        release_login = threading.Event()
+        logged_out = threading.Event()
+
+        def try_login(node_idx, headers, session):
+            self.assertNotIn('APP_SESSION_ID', headers)
+            # Other threads keep using the current session while logging in
+            self.assertTrue(self.clnt._session_lock.acquire(timeout=5))
+            self.clnt._session_lock.release()
+            self.assertIs(self.clnt._session_state().session, old_session)
+            sessions[node_idx] = session
+            session.post.side_effect = lambda *args, **kwargs: \
+                logged_out.set()
+            if node_idx == 3:
+                # The losing node answers after a node was selected
+                self.assertTrue(release_login.wait(5))
+            if isinstance(results[node_idx], Exception):
+                raise results[node_idx]
+            return results[node_idx]
+
+        self.clnt._try_login = Mock(side_effect=try_login)
+        state = self.clnt._session_state()
+        self.assertTrue(self.clnt._renew_session(state, failover=True))
+        self.assertEqual(self.clnt._try_login.call_count, 3)
+        self.assertEqual(len(set(map(id, sessions.values()))), 3)
+        self.assertIs(self.clnt.session, self.clnt._http_session)
+        self.assertEqual(self.clnt._current_host, '3.3.3.3')
+        self.assertEqual(self.clnt.cookies, 'cookies2')
+        self.assertEqual(self.clnt.headers['APP_SESSION_ID'], 'id2')
+        self.assertEqual(self.clnt._file_headers['APP_SESSION_ID'], 'id2')
+        self.assertEqual(self.clnt._node_health[1]['fail_streak'], 1)
+        self.assertEqual(self.clnt.error_msg, '\n2.2.2.2: unreachable\n')
+        # The losing node is logged out of with its own session once its
+        # login finished.
+        sessions[2].post.assert_not_called()
+        release_login.set()
+        self.assertTrue(logged_out.wait(5))
+        sessions[3].post.assert_called_once_with(
+            'https://4.4.4.4:443/web/login/logout.do', cookies='cookies3',
+            headers=dict(self.clnt.headers, APP_SESSION_ID='id3'),
+            timeout=self.clnt.connect_timeout)
+        # A request that failed on the old session does not fail over again
+        self.assertTrue(self.clnt._renew_session(state, failover=True))
+        self.assertEqual(self.clnt._try_login.call_count, 3)
+
+        # The login is not used if the session was replaced meanwhile
+        def replace_session(node_idx, headers, session):
+            self.clnt._session_generation += 1
+            return try_login(node_idx, headers, session)
+
+        old_session = self.clnt.session
+        logged_out.clear()
+        self.clnt._try_login.side_effect = replace_session
+        self.clnt._create_session()
+        self.assertIs(self.clnt.session, old_session)
+        self.assertEqual(self.clnt._current_host, '3.3.3.3')
+        self.assertTrue(logged_out.wait(5))
+
+        results[2] = HTTPError('down')
+        results[3] = HTTPError('down')
+        self.clnt._try_login.side_effect = try_login
+        self.clnt._create_session()
+        self.assertIsNone(self.clnt.session)
+        self.assertNotIn('APP_SESSION_ID', self.clnt.headers)
+        self.assertEqual(self.clnt.error_msg,
+                         '\n4.4.4.4: down\n1.1.1.1: down\n'
+                         '2.2.2.2: unreachable\n')
+
+    def test_create_session_sequential_connect(self):
+        """ Test connecting to all nodes logs in to one node at a time
+            instead of leaving a session open on every node.
+        """
+        nodes = ['1.1.1.1', '2.2.2.2', '3.3.3.3']
+        self.clnt.nodes = nodes
+        self.clnt.node_cnt = len(nodes)
+        self.clnt._node_health = [{'fail_streak': 0, 'ewma_latency': 0.0}
+                                  for _ in nodes]
+        self.clnt._set_node_urls()
+        self.clnt._login_parallel = Mock()
+        self.clnt._reset_session = Mock(return_value=None)
+        self.clnt._create_session(all_nodes=True)
+        self.clnt._login_parallel.assert_not_called()
+        self.assertEqual(self.clnt._reset_session.call_count, 1)
+
+    def test_create_session_parallel_login_cvaas(self):
+        """ Test a failover of a CVaaS client without an API token raises
+            an error instead of sending the user credentials.
+        """
+        nodes = ['1.1.1.1', '2.2.2.2', '3.3.3.3']
+        self.clnt.nodes = nodes
+        self.clnt.node_cnt = len(nodes)
+        self.clnt._node_health = [{'fail_streak': 0, 'ewma_latency': 0.0}
+                                  for _ in nodes]
+        self.clnt._set_node_urls()
+        self.clnt.is_cvaas = True
+        self.clnt._try_login = Mock()
+        with self.assertRaises(CvpLoginError):
+            self.clnt._create_session()
+        self.clnt._try_login.assert_not_called()
+
+    def test_new_login_session(self):
+        """ Test the session of a parallel login has its own cookies but
+            shares the connection pool of the HTTP session.
+        """
+        self.clnt.cert = '/path/cert'
+        self.clnt._http_session = self.clnt._new_session()
+        session = self.clnt._new_login_session()
+        self.assertIsNot(session.cookies, self.clnt._http_session.cookies)
+        self.assertIs(session.get_adapter('https://1.1.1.1'),
+                      self.clnt._http_session.get_adapter('https://1.1.1.1'))
+        self.assertEqual(session.verify, '/path/cert')
+
+    def test_connect_api_token(self):
+        """ Test connecting with an API token uses the first node without
+            trying a login on each node.
+        """
+        self.clnt._create_session = Mock()
+        self.clnt.connect(['1.1.1.1', '2.2.2.2'], '', '', api_token='token')
+        self.clnt._create_session.assert_not_called()
+        self.assertIsNotNone(self.clnt.session)
+        self.assertEqual(self.clnt.url_prefix, 'https://1.1.1.1:443/web')
+        self.assertEqual(self.clnt.headers['Authorization'], 'Bearer token')
+
+    def test_connect_protocol_deprecated(self):
+        """ Test passing the protocol to connect raises a DeprecationWarning
+            and the client keeps reporting https as its protocol.
+        """
+        with self.assertWarns(DeprecationWarning) as ctx:
+            self.clnt.connect(['1.1.1.1'], '', '', protocol='http',
+                              api_token='token')
+        self.assertEqual(ctx.filename, __file__)
+        self.assertEqual(self.clnt.protocol, 'https')
+        self.assertEqual(self.clnt.url_prefix, 'https://1.1.1.1:443/web')
+
+    def test_reset_session_reuses_session(self):
+        """ Test the requests session and its connection pool are kept
+            across logins.
+        """
+        self.clnt._login = Mock()
+        self.assertIsNone(self.clnt._reset_session())
+        session = self.clnt.session
+        self.assertIsNotNone(session)
+        self.assertEqual(
+            session.get_adapter('https://1.1.1.1')._pool_maxsize,
+            self.clnt.POOL_MAXSIZE)
+        session.cookies.set('session_id', 'old')
+
+        self.clnt._login.side_effect = HTTPError('HTTPError')
+        self.assertIsNotNone(self.clnt._reset_session())
+        self.assertIsNone(self.clnt.session)
+
+        self.clnt._login.side_effect = None
+        self.assertIsNone(self.clnt._reset_session())
+        self.assertIs(self.clnt.session, session)
+        self.assertEqual(len(session.cookies), 0)
+
+    def test_new_session_pool_per_node(self):
+        """ Test the connection pool keeps at least one pool per node and
+            sets the socket options.
+        """
+        adapter = self.clnt._new_session().get_adapter('https://1.1.1.1')
+        self.assertEqual(adapter._pool_connections,
+                         self.clnt.POOL_CONNECTIONS)
+        self.clnt.nodes = ['%d.%d.%d.%d' % ((idx,) * 4) for idx in range(6)]
+        adapter = self.clnt._new_session().get_adapter('https://1.1.1.1')
+        self.assertEqual(adapter._pool_connections, 6)
+        self.assertEqual(adapter._pool_maxsize, self.clnt.POOL_MAXSIZE)
+        options = adapter.poolmanager.connection_pool_kw['socket_options']
+        self.assertIn((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1), options)
+        self.assertIn((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1), options)
+
+    @unittest.skipIf(cvp_http2.httpx is None, 'httpx is not installed')
+    def test_http2_session(self):
+        """ Test an HTTP/2 session is used when use_http2 is set and is
+            replaced when connecting with another cert.
+        """
+        clnt = CvpClient(use_http2=True)
+        clnt.cert = True
+        session = clnt._new_session()
+        self.assertIsInstance(session, Http2Session)
+        self.assertTrue(session.verify)
+
+        clnt._http_session = session
+        clnt._clear_http_session()
+        self.assertIs(clnt._http_session, session)
+        clnt.cert = False
+        with patch.object(session, 'close') as mock_close:
+            clnt._clear_http_session()
+        mock_close.assert_called_once_with()
+        self.assertIsInstance(clnt._http_session, Http2Session)
+        self.assertIsNot(clnt._http_session, session)
+        self.assertFalse(clnt._http_session.verify)
+
+    @patch('cvprac.cvp_http2.httpx', None)
+    def test_http2_requires_httpx(self):
+        """ Test use_http2 raises ImportError without httpx.
+        """
+        with self.assertRaises(ImportError):
+            CvpClient(use_http2=True)
+
+    @patch('cvprac.cvp_http2.H2_INSTALLED', False)
+    def test_http2_requires_h2(self):
+        """ Test use_http2 warns and falls back to requests without h2.
+        """
+        with self.assertWarns(RuntimeWarning) as ctx:
+            clnt = CvpClient(use_http2=True)
+        self.assertEqual(ctx.filename, __file__)
+        self.assertFalse(clnt.use_http2)
+        self.assertIsInstance(clnt._new_session(), requests.Session)
+
     def test_make_request_good(self):
         """ Test request does not raise exception and returns json.
         """
         self.clnt.session = Mock()
         self.clnt.session.return_value = True
         request_return_value = Mock()
-        request_return_value.json.return_value = [{"modelName": "vEOS"},
-                                                  {"modelName": "vEOS"}]
+        request_return_value.content = b'[{"modelName": "vEOS"},' \
+                                       b' {"modelName": "vEOS"}]'
         self.clnt.session.get.return_value = request_return_value
         self.clnt._create_session = Mock()
         self.clnt.NUM_RETRY_REQUESTS = 2
         self.clnt.connect_timeout = 2
         self.clnt.node_cnt = 2
         self.clnt.url_prefix = 'https://1.1.1.1:7777/web'
-        self.clnt._is_good_response = Mock(return_value='Good')
         self.assertIsNone(self.clnt.last_used_node)
-        self.clnt._make_request('GET', 'url', 2, {'data': 'data'})
-        request_return_value.json.assert_called_once_with()
+        resp = self.clnt._make_request('GET', 'url', 2, {'data': 'data'})
+        self.assertEqual(resp, [{"modelName": "vEOS"}, {"modelName": "vEOS"}])
         self.assertEqual(self.clnt.last_used_node, '1.1.1.1')
 
     def test_make_request_no_response(self):
@@ -251,7 +556,6 @@ class TestClient(unittest.TestCase):
         self.clnt.connect_timeout = 2
         self.clnt.node_cnt = 2
         self.clnt.url_prefix = 'https://1.1.1.1:7777/web'
-        self.clnt._is_good_response = Mock(return_value='Good')
         self.assertIsNone(self.clnt.last_used_node)
         resp = self.clnt._make_request('GET', 'url', 2, {'data': 'data'})
         expected_response = {"data": []}
@@ -272,7 +576,6 @@ class TestClient(unittest.TestCase):
         self.clnt.connect_timeout = 2
         self.clnt.node_cnt = 2
         self.clnt.url_prefix = 'https://1.1.1.1:7777/web'
-        self.clnt._is_good_response = Mock(return_value='Good')
         self.assertIsNone(self.clnt.last_used_node)
         resp = self.clnt._make_request('GET', 'url', 2, {'data': 'data'})
         expected_response = {"data": []}
@@ -285,16 +588,13 @@ class TestClient(unittest.TestCase):
         self.clnt.session = Mock()
         self.clnt.session.return_value = True
         response_mock = Mock()
-        response_mock.content = b'{"data":"success"}'
-        response_mock.json.return_value = {"result": {"value": "value"}}
-        response_mock.text = '{"result":{"value":"value"}}'
+        response_mock.content = b'{"result":{"value":"value"}}'
         self.clnt.session.get.return_value = response_mock
         self.clnt._create_session = Mock()
         self.clnt.NUM_RETRY_REQUESTS = 2
         self.clnt.connect_timeout = 2
         self.clnt.node_cnt = 2
         self.clnt.url_prefix = 'https://1.1.1.1:7777/web'
-        self.clnt._is_good_response = Mock(return_value='Good')
         self.assertIsNone(self.clnt.last_used_node)
         resp = self.clnt._make_request('GET', 'url', 2, {'data': 'data'})
         expected_response = {"result": {"value": "value"}}
@@ -309,34 +609,21 @@ class TestClient(unittest.TestCase):
         self.clnt.session.return_value = True
         response_mock = Mock()
         response_mock.content = b'{"result":{"value":{' \
-                                b'"key":{"workspaceId":"CVPRAC_TEST",' \
-                                b'"value":"TAGTESTDEV"},' \
+                                b'"key":{"workspaceId":"CVPRACT1",' \
+                                b'"value":"T1"},' \
                                 b'"remove":false},' \
-                                b'"type":"INITIAL"}}\n' \
+                                b'"type":"I1"}}\n' \
                                 b'{"result":{"value":{' \
-                                b'"key":{"workspaceId":"CVPRAC_TEST2",' \
-                                b'"value":"TAGTESTINT"},' \
+                                b'"key":{"workspaceId":"CVPRACT2",' \
+                                b'"value":"T2"},' \
                                 b'"remove":false},' \
-                                b'"type":"INITIAL"}}\n'
-        response_mock.json.side_effect = JSONDecodeError(
-            "Extra data", json.dumps({'key': 'value'}), 1)
-        response_mock.text = '{"result":{"value":{' \
-                             '"key":{"workspaceId":"CVPRACT1",' \
-                             '"value":"T1"},' \
-                             '"remove":false},' \
-                             '"type":"I1"}}\n' \
-                             '{"result":{"value":{' \
-                             '"key":{"workspaceId":"CVPRACT2",' \
-                             '"value":"T2"},' \
-                             '"remove":false},' \
-                             '"type":"I2"}}\n'
+                                b'"type":"I2"}}\n'
         self.clnt.session.get.return_value = response_mock
         self.clnt._create_session = Mock()
         self.clnt.NUM_RETRY_REQUESTS = 2
         self.clnt.connect_timeout = 2
         self.clnt.node_cnt = 2
         self.clnt.url_prefix = 'https://1.1.1.1:7777/web'
-        self.clnt._is_good_response = Mock(return_value='Good')
         self.assertIsNone(self.clnt.last_used_node)
         resp = self.clnt._make_request('GET', 'url', 2, {'data': 'data'})
         multi_objects = [
@@ -352,7 +639,9 @@ class TestClient(unittest.TestCase):
         self.assertEqual(resp, expected_response)
         self.assertEqual(self.clnt.last_used_node, '1.1.1.1')
 
-    def test_make_request_response_content_truncate_long_error(self):
+    @patch('cvprac.cvp_client.json_loads')
+    def test_make_request_response_content_truncate_long_error(
+            self, mock_loads):
         """ Test handling of response being valid multiple JSON objects for
             Streaming JSON with large data that causes for large error message
             to be truncated
@@ -361,15 +650,15 @@ class TestClient(unittest.TestCase):
         self.clnt.session.return_value = True
         response_mock = Mock()
         response_mock.content = b'{"result":{"value":{' \
-                                b'"key":{"workspaceId":"CVPRAC_TEST",' \
-                                b'"value":"TAGTESTDEV"},' \
+                                b'"key":{"workspaceId":"CVPRACT1",' \
+                                b'"value":"T1"},' \
                                 b'"remove":false},' \
-                                b'"type":"INITIAL"}}\n' \
+                                b'"type":"I1"}}\n' \
                                 b'{"result":{"value":{' \
-                                b'"key":{"workspaceId":"CVPRAC_TEST2",' \
-                                b'"value":"TAGTESTINT"},' \
+                                b'"key":{"workspaceId":"CVPRACT2",' \
+                                b'"value":"T2"},' \
                                 b'"remove":false},' \
-                                b'"type":"INITIAL"}}\n'
+                                b'"type":"I2"}}\n'
         long_error = 'Extra data: ' \
                      '{"result":{"value":{"key":{' \
                      '"workspaceId":"builtin-studios-v0.82-evpn-services"},' \
@@ -390,25 +679,14 @@ class TestClient(unittest.TestCase):
                      '{"workspaceId":"builtin-studios1vity-monitor"}' \
                      ',"createdAt":"2022-05-25T23:18:32.368Z",' \
                      '"Build bui1sfully"},"}}'
-        response_mock.json.side_effect = JSONDecodeError(
+        mock_loads.side_effect = json.JSONDecodeError(
             long_error, json.dumps({'key': 'value'}), 1)
-        response_mock.text = '{"result":{"value":{' \
-                             '"key":{"workspaceId":"CVPRACT1",' \
-                             '"value":"T1"},' \
-                             '"remove":false},' \
-                             '"type":"I1"}}\n' \
-                             '{"result":{"value":{' \
-                             '"key":{"workspaceId":"CVPRACT2",' \
-                             '"value":"T2"},' \
-                             '"remove":false},' \
-                             '"type":"I2"}}\n'
         self.clnt.session.get.return_value = response_mock
         self.clnt._create_session = Mock()
         self.clnt.NUM_RETRY_REQUESTS = 2
         self.clnt.connect_timeout = 2
         self.clnt.node_cnt = 2
         self.clnt.url_prefix = 'https://1.1.1.1:7777/web'
-        self.clnt._is_good_response = Mock(return_value='Good')
         self.assertIsNone(self.clnt.last_used_node)
         resp = self.clnt._make_request('GET', 'url', 2, {'data': 'data'})
         multi_objects = [
@@ -424,7 +702,9 @@ class TestClient(unittest.TestCase):
         self.assertEqual(resp, expected_response)
         self.assertEqual(self.clnt.last_used_node, '1.1.1.1')
 
-    def test_make_request_response_content_incomplete_json_object(self):
+    @patch('cvprac.cvp_client.json_loads')
+    def test_make_request_response_content_incomplete_json_object(
+            self, mock_loads):
         """ Test handling of response being invalid JSON objects for
             Streaming JSON.
         """
@@ -441,31 +721,44 @@ class TestClient(unittest.TestCase):
                                 b'"value":"TAGTESTINT"},' \
                                 b'"remove":false},' \
                                 b'"type":"INITIAL"\n'
-        response_mock.json.side_effect = JSONDecodeError(
+        mock_loads.side_effect = json.JSONDecodeError(
             "Unknown", json.dumps({'key': 'value'}), 1)
-        response_mock.text = '{"result":{"value":{' \
-                             '"key":{"workspaceId":"CVPRACT1",' \
-                             '"value":"T1"},' \
-                             '"remove":false},' \
-                             '"type":"I1"}}\n' \
-                             '{"result":{"value":{' \
-                             '"key":{"workspaceId":"CVPRACT2",' \
-                             '"value":"T2"},' \
-                             '"remove":false},' \
-                             '"type":"I2"\n'
         self.clnt.session.get.return_value = response_mock
         self.clnt._create_session = Mock()
         self.clnt.NUM_RETRY_REQUESTS = 2
         self.clnt.connect_timeout = 2
         self.clnt.node_cnt = 2
         self.clnt.url_prefix = 'https://1.1.1.1:7777/web'
-        self.clnt._is_good_response = Mock(return_value='Good')
         self.assertIsNone(self.clnt.last_used_node)
         with self.assertRaises(JSONDecodeError):
             self.clnt._make_request('GET', 'url', 2, {'data': 'data'})
         self.assertEqual(self.clnt.last_used_node, '1.1.1.1')
 
-    def test_make_request_timeout(self):
+    def test_decode_response_partial_stream(self):
+        """ Test the objects before an incomplete Stream JSON object are
+            returned, the same as json_decoder does.
+        """
+        content = b'{"a": 1}\n{"b": 2}\n{"c": '
+        self.assertEqual(self.clnt._decode_response(content),
+                         {'data': [{'a': 1}, {'b': 2}]})
+        self.assertEqual(self.clnt._decode_response(b'{"a": 1}\n{"b": '),
+                         {'data': json_decoder('{"a": 1}\n{"b": ')})
+        with self.assertRaises(JSONDecodeError):
+            self.clnt._decode_response(b'{"a": ')
+
+    def test_decode_response_stdlib_fallback(self):
+        """ Test JSON that the json module accepts decodes whether or not
+            orjson is installed.
+        """
+        resp = self.clnt._decode_response(b'{"a": NaN, "b": Infinity}')
+        self.assertNotEqual(resp['a'], resp['a'])
+        self.assertEqual(resp['b'], float('inf'))
+        with patch('cvprac.cvp_json.orjson', None):
+            resp = self.clnt._decode_response(b'{"a": NaN}')
+        self.assertNotEqual(resp['a'], resp['a'])
+
+    @patch('cvprac.cvp_client.time.sleep')
+    def test_make_request_timeout(self, mock_sleep):
         """ Test request timeout exception raised if hit on multiple nodes.
         """
         self.clnt.session = Mock()
@@ -481,6 +774,40 @@ class TestClient(unittest.TestCase):
         with self.assertRaises(ReadTimeout):
             self.clnt._make_request('GET', 'url', 2, {'data': 'data'})
         self.assertEqual(self.clnt.last_used_node, '1.1.1.1')
+        # Two backoff sleeps between the three tries on each of three nodes
+        self.assertEqual(mock_sleep.call_count, 6)
+
+    @patch('cvprac.cvp_client.time.sleep')
+    def test_make_request_service_unavailable_retry(self, mock_sleep):
+        """ Test request is retried on the same node after a 503 response
+            honoring the Retry-After header.
+        """
+        unavailable = Mock()
+        unavailable.status_code = 503
+        unavailable.headers = {'Retry-After': '7'}
+        good = Mock()
+        good.content = b''
+        self.clnt.session = Mock()
+        self.clnt.session.get.side_effect = [unavailable, good]
+        self.clnt.NUM_RETRY_REQUESTS = 3
+        self.clnt.connect_timeout = 2
+        self.clnt.url_prefix = 'https://1.1.1.1:7777/web'
+        resp = self.clnt._make_request('GET', 'url', 2)
+        self.assertEqual(resp, {'data': []})
+        self.assertEqual(self.clnt.session.get.call_count, 2)
+        mock_sleep.assert_called_once_with(7.0)
+
+    def test_backoff_delay(self):
+        """ Test exponential backoff delay is jittered and capped.
+        """
+        for attempt in range(3):
+            base = 2 ** attempt
+            delay = self.clnt._backoff_delay(attempt)
+            self.assertGreaterEqual(delay, base)
+            self.assertLessEqual(delay, base * 1.5)
+        delay = self.clnt._backoff_delay(10)
+        self.assertGreaterEqual(delay, 30)
+        self.assertLessEqual(delay, 45)
 
     def test_make_request_http_error(self):
         """ Test request http exception raised if hit on multiple nodes.
@@ -573,6 +900,287 @@ class TestClient(unittest.TestCase):
             self.clnt._make_request('GET', 'url', 2, {'data': 'data'})
         self.assertEqual(self.clnt.last_used_node, '1.1.1.1')
 
+    def test_is_good_response_sentinels(self):
+        """ Test unauthorized and logged out responses are detected from
+            the raw response content.
+        """
+        response = Mock()
+        response.ok = False
+        response.reason = 'Forbidden'
+        response.content = b'{"errorMessage": "User is unauthorized"}'
+        with self.assertRaisesRegex(CvpApiError, 'User is unauthorized'):
+            self.clnt._is_good_response(response, 'GET: url')
+
+        response = Mock()
+        response.ok = True
+        response.content = b'<html>LOG OUT MESSAGE</html>'
+        with self.assertRaises(CvpSessionLogOutError):
+            self.clnt._is_good_response(response, 'GET: url')
+
+    def test_is_good_response_error_list(self):
+        """ Test all errors of a response are joined into the message.
+        """
+        response = Mock()
+        response.ok = True
+        response.content = b'{"errorCode": "112498", "errors": ["a", "b"]}'
+        response.json.return_value = json.loads(response.content)
+        with self.assertRaises(CvpApiError) as ctx:
+            self.clnt._is_good_response(response, 'GET: url')
+        self.assertEqual(ctx.exception.msg, 'GET: url: Request Error: a\nb')
+
+    @patch('cvprac.cvp_client.time.sleep')
+    @patch('cvprac.cvp_client.json_dumps', return_value=b'{"key": 1}')
+    def test_make_request_post_body_serialized_once(self, mock_dumps, _):
+        """ Test a POST body is serialized once for all of the retries.
+        """
+        good = Mock(status_code=200, content=b'{"result": "ok"}')
+        self.clnt.session = Mock()
+        self.clnt.session.post.side_effect = [ReadTimeout('Timeout'),
+                                              ReadTimeout('Timeout'), good]
+        self.clnt.connect_timeout = 2
+        self.clnt.url_prefix = 'https://1.1.1.1:443/web'
+        resp = self.clnt._make_request('POST', '/url', 2, {'key': 1})
+        self.assertEqual(resp, {'result': 'ok'})
+        mock_dumps.assert_called_once_with({'key': 1})
+        for call in self.clnt.session.post.call_args_list:
+            self.assertEqual(call[1]['data'], b'{"key": 1}')
+
+    @patch('cvprac.cvp_client.json_dumps')
+    def test_post_raw_body(self, mock_dumps):
+        """ Test a pre-serialized body is sent as is.
+        """
+        self.clnt.session = Mock()
+        self.clnt.session.post.return_value = Mock(content=b'{}')
+        self.clnt.url_prefix = 'https://1.1.1.1:443/web'
+        self.clnt.connect_timeout = 2
+        self.clnt.post('/url', raw_body=b'{"key": 1}')
+        mock_dumps.assert_not_called()
+        self.assertEqual(self.clnt.session.post.call_args[1]['data'],
+                         b'{"key": 1}')
+
+    @patch('cvprac.cvp_client.time.monotonic')
+    def test_get_cache(self, mock_time):
+        """ Test GET responses are cached for allowed URLs until the TTL
+            expires or a POST is made.
+        """
+        mock_time.return_value = 100.0
+        self.clnt.session = Mock()
+        self.clnt._make_request = Mock(
+            side_effect=lambda req_type, url, timeout, **kwargs: {'data': [1]})
+        # Caching is disabled by default
+        self.clnt.get('/inventory/devices')
+        self.clnt.get('/inventory/devices')
+        self.assertEqual(self.clnt._make_request.call_count, 2)
+
+        self.clnt.GET_CACHE_TTL = 5
+        self.clnt._make_request.reset_mock()
+        resp = self.clnt.get('/inventory/devices')
+        resp['data'].append(2)
+        resp = self.clnt.get('/inventory/devices')
+        self.assertEqual(resp, {'data': [1]})
+        resp['data'].append(3)
+        self.assertEqual(self.clnt.get('/inventory/devices'), {'data': [1]})
+        self.assertEqual(self.clnt._make_request.call_count, 1)
+        # URLs that are not allowed are not cached. The CVP info is cached
+        # by CvpApi.get_cvp_info instead.
+        self.clnt.get('/configlet/getConfiglets.do')
+        self.clnt.get('/configlet/getConfiglets.do')
+        self.clnt.get('/cvpInfo/getCvpInfo.do')
+        self.clnt.get('/cvpInfo/getCvpInfo.do')
+        self.assertEqual(self.clnt._make_request.call_count, 5)
+        # batch uses the cache for its GET calls
+        self.assertEqual(self.clnt.batch([('GET', '/inventory/devices')]),
+                         [{'data': [1]}])
+        self.assertEqual(self.clnt._make_request.call_count, 5)
+        # Entries expire after the TTL
+        mock_time.return_value = 105.0
+        self.clnt.get('/inventory/devices')
+        self.assertEqual(self.clnt._make_request.call_count, 6)
+        self.clnt.clear_cache()
+        self.clnt.get('/inventory/devices')
+        self.assertEqual(self.clnt._make_request.call_count, 7)
+
+    def test_make_request_clears_cache(self):
+        """ Test a POST drops the cached GET responses.
+        """
+        self.clnt.session = Mock()
+        self.clnt.session.post.return_value = Mock(content=b'{}')
+        self.clnt.url_prefix = 'https://1.1.1.1:443/web'
+        self.clnt._get_cache['/inventory/devices'] = (1e9, {'data': []})
+        self.clnt._make_request('POST', '/url', 2, {'key': 1})
+        self.assertEqual(self.clnt._get_cache, {})
+
+    @patch('cvprac.cvp_client.threading.Thread')
+    def test_keepalive(self, mock_thread):
+        """ Test the keepalive thread makes a request every interval until
+            it is stopped, except while a request is in flight.
+        """
+        self.clnt._start_keepalive()
+        kwargs = mock_thread.call_args[1]
+        self.assertIs(kwargs['target'], _keepalive)
+        client_ref, stop = kwargs['args']
+        self.assertIs(client_ref(), self.clnt)
+        self.assertTrue(mock_thread.return_value.daemon)
+        mock_thread.return_value.start.assert_called_once_with()
+        self.clnt._stop_keepalive()
+        self.assertTrue(stop.is_set())
+
+        # Run the thread function with a stop event that is set after one
+        # interval.
+        self.clnt.session = Mock()
+        self.clnt._make_request = Mock()
+        stop = Mock()
+        stop.wait.side_effect = [False, True]
+        _keepalive(weakref.ref(self.clnt), stop)
+        stop.wait.assert_called_with(self.clnt.KEEPALIVE_INTERVAL)
+        self.clnt._make_request.assert_called_once_with(
+            'GET', '/cvpInfo/getCvpInfo.do', self.clnt.api.request_timeout)
+
+        # No ping is sent while a request is in flight
+        self.clnt._make_request.reset_mock()
+        self.clnt._requests_in_flight = 1
+        stop.wait.side_effect = [False, True]
+        _keepalive(weakref.ref(self.clnt), stop)
+        self.clnt._make_request.assert_not_called()
+
+    def test_get_stream(self):
+        """ Test get_stream yields each Stream JSON object and closes the
+            response.
+        """
+        response = Mock(ok=True)
+        response.iter_lines.return_value = iter(
+            [b'{"result": {"value": 1}}', b'', b'{"result": {"value": 2}}'])
+        self.clnt.session = Mock()
+        self.clnt.session.get.return_value = response
+        self.clnt.url_prefix_short = 'https://1.1.1.1:443'
+        resp = self.clnt.get_stream('/api/resources/tag/v2/Tag/all')
+        self.assertEqual(list(resp), [{'result': {'value': 1}},
+                                      {'result': {'value': 2}}])
+        self.assertEqual(self.clnt.session.get.call_args[0][0],
+                         'https://1.1.1.1:443/api/resources/tag/v2/Tag/all')
+        self.assertTrue(self.clnt.session.get.call_args[1]['stream'])
+        response.close.assert_called_once_with()
+
+        response.iter_lines.return_value = iter([b'{"result": '])
+        with self.assertRaises(JSONDecodeError):
+            list(self.clnt.get_stream('/api/resources/tag/v2/Tag/all'))
+
+    def test_batch(self):
+        """ Test batch makes every call and returns the responses in the
+            order of the calls.
+        """
+        self.clnt._make_request = Mock(
+            side_effect=lambda req_type, url, timeout, data=None: (
+                req_type, url, timeout, data))
+        calls = [('GET', '/url%d' % idx) for idx in range(20)]
+        calls.append(('POST', '/post', {'key': 'value'}))
+        resp = self.clnt.batch(calls, max_inflight=4, timeout=5)
+        expected = [('GET', '/url%d' % idx, 5, None) for idx in range(20)]
+        expected.append(('POST', '/post', 5, {'key': 'value'}))
+        self.assertEqual(resp, expected)
+
+        # The connection pool grows to hold max_inflight connections
+        self.clnt._http_session = self.clnt._new_session()
+        old_adapter = self.clnt._http_session.get_adapter('https://1.1.1.1')
+        old_adapter.close = Mock()
+        self.clnt.batch([('GET', '/url')], max_inflight=64)
+        adapter = self.clnt._http_session.get_adapter('https://1.1.1.1')
+        self.assertEqual(adapter._pool_maxsize, 64)
+        old_adapter.close.assert_called_once_with()
+
+        # An adapter replaced while a request is in flight is closed once
+        # the request finished.
+        adapter.close = Mock()
+        self.clnt._requests_in_flight = 1
+        self.clnt._grow_connection_pool(128)
+        adapter.close.assert_not_called()
+        self.clnt._requests_in_flight = 0
+        self.clnt._close_retired_adapters()
+        adapter.close.assert_called_once_with()
+
+        self.clnt._make_request.side_effect = HTTPError('HTTPError')
+        with self.assertRaises(HTTPError):
+            self.clnt.batch([('GET', '/url')])
+
+    def test_batch_failover(self):
+        """ Test requests of a batch that fail on a node at the same time
+            fail over once and are all retried on the new node.
+        """
+        nodes = ['1.1.1.1', '2.2.2.2']
+        self.clnt.nodes = nodes
+        self.clnt.node_cnt = len(nodes)
+        self.clnt._node_idx = 0
+        self.clnt._node_health = [{'fail_streak': 0, 'ewma_latency': 0.0}
+                                  for _ in nodes]
+        self.clnt._set_node_urls()
+        self.clnt._select_node(0)
+        self.clnt.connect_timeout = 2
+        self.clnt.NUM_RETRY_REQUESTS = 1
+        self.clnt._http_session = Mock()
+        self.clnt.session = self.clnt._http_session
+        # All of the first requests are in flight before any of them fails
+        in_flight = threading.Barrier(4, timeout=5)
+
+        failed = []
+        all_failed = threading.Event()
+
+        def get(url, **kwargs):
+            if url.startswith('https://1.1.1.1'):
+                in_flight.wait()
+                failed.append(url)
+                if len(failed) == 4:
+                    all_failed.set()
+                raise HTTPError('connection reset')
+            response = Mock()
+            response.content = b'{"url": "%s"}' % url.encode()
+            return response
+
+        def try_login(node_idx, headers=None, session=None):
+            # Log in once all of the requests failed on the first node
+            self.assertTrue(all_failed.wait(5))
+            return Mock(cookies='cookies'), {'sessionId': 'id%d' % node_idx}
+
+        self.clnt._http_session.get.side_effect = get
+        self.clnt._try_login = Mock(side_effect=try_login)
+        calls = [('GET', '/url%d' % idx) for idx in range(4)]
+        resp = self.clnt.batch(calls, max_inflight=4)
+        self.assertEqual(resp, [{'url': 'https://2.2.2.2:443/web/url%d' % idx}
+                                for idx in range(4)])
+        self.assertEqual(self.clnt._try_login.call_count, 1)
+        self.assertEqual(self.clnt._try_login.call_args[0][0], 1)
+        self.assertEqual(self.clnt.headers['APP_SESSION_ID'], 'id1')
+        self.assertEqual(self.clnt._node_health[0]['fail_streak'], 4)
+
+    @patch('cvprac.cvp_client.MultipartEncoder')
+    def test_make_request_stream_upload(self, mock_encoder):
+        """ Test file uploads are streamed with a multipart encoder.
+        """
+        mock_encoder.return_value.content_type = 'multipart/form-data; b=x'
+        self.clnt.session = Mock()
+        self.clnt.session.post.return_value.content = b'{"result": "ok"}'
+        self.clnt.session.post.return_value.json.return_value = {
+            'result': 'ok'}
+        self.clnt.connect_timeout = 2
+        self.clnt.url_prefix = 'https://1.1.1.1:7777/web'
+        self.clnt.headers['APP_SESSION_ID'] = 'session'
+        self.clnt._update_file_headers()
+        image = io.BytesIO(b'image data')
+        image.name = '/tmp/EOS.swi'
+        image.read()
+        resp = self.clnt._make_request('POST', '/image/addImage.do', 2,
+                                       files={'file': image})
+        self.assertEqual(resp, {'result': 'ok'})
+        mock_encoder.assert_called_once_with(
+            fields={'file': ('EOS.swi', image, 'application/octet-stream')})
+        self.assertEqual(image.tell(), 0)
+        kwargs = self.clnt.session.post.call_args[1]
+        self.assertIs(kwargs['data'], mock_encoder.return_value)
+        self.assertNotIn('files', kwargs)
+        self.assertEqual(kwargs['headers'],
+                         {'Accept': 'application/json',
+                          'APP_SESSION_ID': 'session',
+                          'Content-Type': 'multipart/form-data; b=x'})
+
     def test_finditem(self):
         """ Test _finditem
         """
@@ -585,6 +1193,9 @@ class TestClient(unittest.TestCase):
         value = self.clnt._finditem(testobj, 'key5')
         self.assertIsNone(value)
 
+        value = self.clnt._finditem(5, 'key5')
+        self.assertIsNone(value)
+
         value = self.clnt._finditem(testobj, 'key1')
         self.assertEqual(value, 'value1')
 
@@ -600,6 +1211,43 @@ class TestClient(unittest.TestCase):
         value = self.clnt._finditem(testobj, 'nestobjkey2')
         self.assertEqual(value, 'nestobjval2')
 
+        # First match in depth first order wins and None values are skipped
+        testobj = {'a': {'b': {'key': None}, 'key': 'inner'},
+                   'c': [{'key': 'list'}], 'key2': 'value2'}
+        value = self.clnt._finditem(testobj, 'key')
+        self.assertEqual(value, 'inner')
+        testobj['a']['key'] = None
+        value = self.clnt._finditem(testobj, 'key')
+        self.assertEqual(value, 'list')
+
+        # Deeply nested objects do not hit the recursion limit
+        testobj = {'key': 'deep'}
+        for _ in range(5000):
+            testobj = {'nest': [testobj]}
+        value = self.clnt._finditem(testobj, 'key')
+        self.assertEqual(value, 'deep')
+
+    def test_json_dumps(self):
+        """ Test request bodies are compact UTF-8 JSON with and without
+            orjson.
+        """
+        data = {'name': u'd\u00e9vice', 'ids': [1, 2]}
+        expected = u'{"name":"d\u00e9vice","ids":[1,2]}'.encode('utf-8')
+        self.assertEqual(json_dumps(data), expected)
+        with patch('cvprac.cvp_json.orjson', None):
+            self.assertEqual(json_dumps(data), expected)
+
+    def test_json_decoder(self):
+        """ Test json_decoder with newline separated, adjacent and invalid
+            Stream JSON objects.
+        """
+        self.assertEqual(json_decoder('{"a": 1}\n{"b": 2}\n'),
+                         [{'a': 1}, {'b': 2}])
+        self.assertEqual(json_decoder('{"a": 1}{"b": 2}'),
+                         [{'a': 1}, {'b': 2}])
+        self.assertEqual(json_decoder('{"a": 1}\n'), {'a': 1})
+        self.assertEqual(json_decoder('{"a": 1}\n{"b": '), {'a': 1})
+
 
 if __name__ == '__main__':
     unittest.main()
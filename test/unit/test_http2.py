@@ -0,0 +1,197 @@
+# pylint: disable=wrong-import-position
+#
+# Copyright (c) 2017, Arista Networks, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+#   Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+#   Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in the
+#   documentation and/or other materials provided with the distribution.
+#
+#   Neither the name of Arista Networks nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# 'AS IS' AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL ARISTA NETWORKS
+# BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR
+# BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN
+# IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+
+''' Unit tests for the Http2Session class
+'''
+import io
+import unittest
+# pylint: disable=redefined-builtin
+from requests.exceptions import ConnectionError, ReadTimeout
+from cvprac.cvp_http2 import Http2Session, httpx
+
+
+@unittest.skipIf(httpx is None, 'httpx is not installed')
+class TestHttp2Session(unittest.TestCase):
+    """ Unit test cases for Http2Session with requests handled by an
+        httpx.MockTransport.
+    """
+    def setUp(self):
+        """ Setup for Http2Session unittests
+        """
+        self.requests = []
+        self.handler = None
+        transport = httpx.MockTransport(self._handle)
+        self.session = Http2Session(False, 4, transport=transport)
+        self.addCleanup(self.session.close)
+
+    def _handle(self, request):
+        """ Record the request and return the response of self.handler.
+        """
+        request.read()
+        self.requests.append(request)
+        return self.handler(request)
+
+    def test_request(self):
+        """ Test the requests.Session arguments are sent and the response
+            provides the requests.Response attributes.
+        """
+        self.handler = lambda request: httpx.Response(
+            401, content=b'{}', headers={'Set-Cookie': 'session_id=abc'})
+        response = self.session.post('https://1.1.1.1/url', cookies=None,
+                                     data=b'{"key": 1}', headers={'A': 'B'},
+                                     timeout=(2, 30), verify=False)
+        self.assertFalse(response.ok)
+        self.assertFalse(response)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.reason, 'Unauthorized')
+        self.assertEqual(response.content, b'{}')
+        self.assertEqual(response.text, '{}')
+        request = self.requests[0]
+        self.assertEqual(request.method, 'POST')
+        self.assertEqual(str(request.url), 'https://1.1.1.1/url')
+        self.assertEqual(request.headers['A'], 'B')
+        self.assertEqual(request.content, b'{"key": 1}')
+        self.assertEqual(request.extensions['timeout'],
+                         {'connect': 2, 'read': 30, 'write': 30, 'pool': 30})
+        self.assertEqual(self.session.cookies['session_id'], 'abc')
+
+    def test_request_file_body(self):
+        """ Test file like bodies are streamed.
+        """
+        self.handler = lambda request: httpx.Response(200, content=b'{}')
+        self.session.post('https://1.1.1.1/upload',
+                          data=io.BytesIO(b'x' * 100000))
+        self.assertEqual(self.requests[0].content, b'x' * 100000)
+
+    def test_request_cookies(self):
+        """ Test the cookies argument is sent instead of the cookies kept
+            by the httpx client.
+        """
+        self.handler = lambda request: httpx.Response(200, content=b'{}')
+        self.session.cookies.set('session_id', 'old', domain='1.1.1.1')
+        self.session.get('https://1.1.1.1/url')
+        self.assertEqual(self.requests[0].headers['Cookie'],
+                         'session_id=old')
+        self.session.get('https://1.1.1.1/url',
+                         cookies={'session_id': 'new', 'other': 'x'})
+        self.assertEqual(self.requests[1].headers['Cookie'],
+                         'session_id=new; other=x')
+
+    def test_fork(self):
+        """ Test a forked session shares the transport but not the
+            cookies.
+        """
+        self.handler = lambda request: httpx.Response(
+            200, content=b'{}', headers={
+                'Set-Cookie': 'session_id=%s' % request.url.host})
+        fork = self.session.fork()
+        fork.get('https://1.1.1.1/login')
+        self.session.get('https://2.2.2.2/login')
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(dict(fork.cookies), {'session_id': '1.1.1.1'})
+        self.assertEqual(dict(self.session.cookies),
+                         {'session_id': '2.2.2.2'})
+        self.assertEqual(fork.verify, self.session.verify)
+
+    def test_request_verify(self):
+        """ Test a request with another verify setting than the session
+            raises ValueError.
+        """
+        self.handler = lambda request: httpx.Response(200, content=b'{}')
+        self.session.get('https://1.1.1.1/url', verify=False)
+        with self.assertRaises(ValueError):
+            self.session.get('https://1.1.1.1/url', verify='/path/cert')
+        self.assertEqual(len(self.requests), 1)
+
+    def test_request_stream(self):
+        """ Test a streamed body is read while iterating over its lines.
+        """
+        chunks = [b'{"a": 1}\n{"b"', b': 2}\r\n', b'\n{"c": 3}']
+        sent = []
+
+        def body():
+            for chunk in chunks:
+                sent.append(chunk)
+                yield chunk
+
+        self.handler = lambda request: httpx.Response(200, content=body())
+        response = self.session.get('https://1.1.1.1/url', stream=True)
+        self.assertEqual(sent, [])
+        lines = response.iter_lines()
+        self.assertEqual(next(lines), b'{"a": 1}')
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(list(lines), [b'{"b": 2}', b'', b'{"c": 3}'])
+        response.close()
+
+        # Without stream the body is read by the request
+        sent.clear()
+        response = self.session.get('https://1.1.1.1/url')
+        self.assertEqual(len(sent), 3)
+        self.assertEqual(list(response.iter_lines()),
+                         [b'{"a": 1}', b'{"b": 2}', b'', b'{"c": 3}'])
+
+    def test_request_errors(self):
+        """ Test httpx errors are raised as requests errors.
+        """
+        error = httpx.ReadTimeout('timed out')
+
+        def timeout(request):
+            raise error
+
+        self.handler = timeout
+        with self.assertRaises(ReadTimeout) as ctx:
+            self.session.get('https://1.1.1.1/url')
+        self.assertIs(ctx.exception.__cause__, error)
+
+        def refused(request):
+            raise httpx.ConnectError('refused', request=request)
+
+        self.handler = refused
+        with self.assertRaises(ConnectionError):
+            self.session.get('https://1.1.1.1/url')
+
+        def body():
+            yield b'{"a": 1}\n'
+            raise httpx.ReadTimeout('timed out')
+
+        self.handler = lambda request: httpx.Response(200, content=body())
+        response = self.session.get('https://1.1.1.1/url', stream=True)
+        with self.assertRaises(ReadTimeout):
+            list(response.iter_lines())
+        response = self.session.get('https://1.1.1.1/url', stream=True)
+        with self.assertRaises(ReadTimeout):
+            response.content  # pylint: disable=pointless-statement
+
+
+if __name__ == '__main__':
+    unittest.main()